@@ -1,58 +1,51 @@
-from simdrone import Simulator
-import threading
-import time
-import queue
-
-def control_drones(sim):
-    """Control logic running in a separate thread."""
-    time.sleep(1) # Wait for sim to start
-    
+from simdrone import Simulator, Logger
+
+def control_drones(sim, t, dt):
+    """Control logic, called by the simulator at a fixed rate with the simulated time."""
+    if t < 1.0:
+        return # Wait for sim to start
+
     # Drone 0: Hover, Drone 1: Stay
-    sim.drones[0].set_control(thrust=0.3)
-    sim.drones[1].set_control(thrust=0.0) # Stay on ground
-    time.sleep(2)
+    if t < 3.0:
+        sim.drones[0].set_control(thrust=0.3)
+        sim.drones[1].set_control(thrust=0.0) # Stay on ground
 
     # Drone 0: Hover, Drone 1: Takeoff
-    sim.drones[0].set_control(thrust=0.28)
-    sim.drones[1].set_control(thrust=0.35)
-    time.sleep(2)
+    elif t < 5.0:
+        sim.drones[0].set_control(thrust=0.28)
+        sim.drones[1].set_control(thrust=0.35)
 
     # Drone 0: Pitch forward, Drone 1: Hover
-    sim.drones[0].set_control(thrust=0.28, pitch=0.01)
-    sim.drones[1].set_control(thrust=0.28)
-    time.sleep(0.1)
+    elif t < 5.1:
+        sim.drones[0].set_control(thrust=0.28, pitch=0.01)
+        sim.drones[1].set_control(thrust=0.28)
 
     # Both stop
-    sim.drones[0].set_control(thrust=0.0)
-    sim.drones[1].set_control(thrust=0.0)
-    time.sleep(2)
+    elif t < 8.1:
+        sim.drones[0].set_control(thrust=0.0)
+        sim.drones[1].set_control(thrust=0.0)
 
     # Stop all
-    sim.drones[0].set_control(thrust=0.0)
-    sim.drones[1].set_control(thrust=0.0)
-    time.sleep(1)
-    
-    sim.running = False
+    else:
+        sim.running = False
 
 def main():
     num_drones = 2
 
     # Simulator now manages the plotter internally
-    sim = Simulator(num_drones=num_drones)
-    
-    # Start control thread
-    control_thread = threading.Thread(target=control_drones, args=(sim,))
-    control_thread.start()
+    # Telemetry is streamed to a segment directory while the window is open
+    sim = Simulator(num_drones=num_drones, logger=Logger(stream=True))
+
+    # Runs inside the physics loop, 100 times per simulated second
+    sim.add_controller(control_drones, rate_hz=100)
 
     # Run Simulator in Main Thread
     # (Required for tkinter/matplotlib GUI interaction)
-    data = sim.run() 
-    
-    control_thread.join()
+    sim.run()
 
     print('start')
-    print(f"Logged {len(data)} entries.")
+    print(f"Logged {len(sim.logger)} entries to {sim.logger.filename}.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
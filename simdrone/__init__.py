@@ -12,9 +12,44 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from os import environ
 from os.path import dirname
-from sys import path
+from sys import path, platform
 
 path.insert(0, dirname(__file__))
 
-from simulator import Simulator
\ No newline at end of file
+# Linux without a display: let PyOpenGL bind to EGL so offscreen.VideoRecorder works (must
+# precede any OpenGL import). Windows and macOS never set DISPLAY and have no EGL to fall back on.
+if platform.startswith('linux') and not environ.get('DISPLAY') and not environ.get('WAYLAND_DISPLAY'):
+    environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+from headless import HeadlessSimulator
+from logger import Logger, LogReader
+from batch import run_batch, parameter_grid, parameter_samples, BatchResult
+
+
+
+
+def _unavailable(name, error):
+    """Stand-in for a class whose optional dependencies failed to import: raises that error when used"""
+    def unavailable(*args, **kwargs):
+        raise ImportError(f"{name} is unavailable: {error}") from error
+    unavailable.__name__ = name
+    unavailable.error = error
+    return unavailable
+
+
+# GUI, replay and offscreen recording each need their own optional packages
+# (pygame / PyOpenGL / PyQt6); whatever is missing only disables what needs it
+try:
+    from simulator import Simulator
+except ImportError as error:
+    Simulator = _unavailable('Simulator', error)
+try:
+    from replay import ReplayViewer
+except ImportError as error:
+    ReplayViewer = _unavailable('ReplayViewer', error)
+try:
+    from offscreen import VideoRecorder
+except ImportError as error:
+    VideoRecorder = _unavailable('VideoRecorder', error)
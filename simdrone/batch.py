@@ -0,0 +1,187 @@
+# batch.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import itertools
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+
+from headless import HeadlessSimulator
+from swarm import SwarmState
+
+
+
+
+
+
+def parameter_grid(**axes):
+    """Cartesian product of value lists, as a dict of equal-length arrays"""
+    names = list(axes)
+    combos = list(itertools.product(*(np.atleast_1d(axes[name]) for name in names)))
+    return {name: np.array([c[k] for c in combos]) for k, name in enumerate(names)}
+
+
+def parameter_samples(count, seed=None, **distributions):
+    """`count` random scenarios, as a dict of equal-length arrays
+
+    Each distribution is a (low, high) pair for a uniform draw, a callable
+    fn(rng, count) returning `count` values, or a constant.
+    """
+    rng = np.random.default_rng(seed)
+    params = {}
+    for name, dist in distributions.items():
+        if callable(dist):
+            params[name] = np.asarray(dist(rng, count))
+        elif isinstance(dist, tuple) and len(dist) == 2:
+            params[name] = rng.uniform(dist[0], dist[1], count)
+        else:
+            params[name] = np.full(count, dist)
+    return params
+
+
+def default_metrics(sim):
+    """Summary of one finished run, averaged over drones where it makes sense"""
+    log = sim.logger.array
+    z = log[:, sim.logger.columns('position')[:, 2]]
+    speed = np.linalg.norm(log[:, sim.logger.columns('velociaty')], axis=2)
+    tilt = np.abs(log[:, sim.logger.columns('rotation')[:, [0, 2]]])
+    final = sim.swarm.position
+    return {
+        'final_x': final[:, 0].mean(),
+        'final_y': final[:, 1].mean(),
+        'final_altitude': -final[:, 2].mean(),
+        'max_altitude': -z.min(),
+        'max_speed': speed.max(),
+        'max_tilt': tilt.max(),
+    }
+
+
+class BatchResult:
+    """Columnar results: `params` and `metrics` are dicts of arrays, one entry per scenario
+
+    With trajectories, `trajectories[i]` holds the zlib-compressed float32 log of
+    scenario i (every `stride`-th row, columns named by `fieldnames`).
+    """
+
+    def __init__(self, params, metrics, trajectories=None, fieldnames=None):
+        self.params = params
+        self.metrics = metrics
+        self.trajectories = trajectories
+        self.fieldnames = fieldnames
+
+    def __len__(self):
+        return len(next(iter(self.params.values()))) if self.params else 0
+
+    def __getitem__(self, name):
+        return self.metrics[name] if name in self.metrics else self.params[name]
+
+    def trajectory(self, i):
+        data = np.frombuffer(zlib.decompress(self.trajectories[i]), dtype=np.float32)
+        return data.reshape(-1, len(self.fieldnames))
+
+    def best(self, metric, minimize=True):
+        """Parameters of the scenario with the lowest (or highest) `metric`"""
+        values = self.metrics[metric]
+        i = int(np.nanargmin(values) if minimize else np.nanargmax(values))
+        return {name: column[i] for name, column in self.params.items()}
+
+    def save(self, path):
+        arrays = {f'param_{k}': v for k, v in self.params.items()}
+        arrays.update({f'metric_{k}': v for k, v in self.metrics.items()})
+        if self.trajectories is not None:
+            arrays['trajectories'] = np.array(self.trajectories, dtype=object)
+            arrays['fieldnames'] = np.array(self.fieldnames)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as f:
+            params = {k[6:]: f[k] for k in f.files if k.startswith('param_')}
+            metrics = {k[7:]: f[k] for k in f.files if k.startswith('metric_')}
+            trajectories = list(f['trajectories']) if 'trajectories' in f.files else None
+            fieldnames = list(f['fieldnames']) if 'fieldnames' in f.files else None
+        return cls(params, metrics, trajectories, fieldnames)
+
+
+def _run_one(scenario, params, options):
+    sim = HeadlessSimulator(num_drones=options['num_drones'], dt=options['dt'], integrator=options['integrator'])
+    sim.swarm.set_parameters(**{k: v for k, v in params.items() if k in SwarmState.PARAMETERS})
+    if scenario is not None:
+        scenario(sim, params)
+    for _ in range(round(options['duration'] / options['dt'])):
+        if not sim.running:
+            break
+        sim.step()
+    metrics = (options['metrics'] or default_metrics)(sim)
+    trajectory = None
+    if options['trajectories']:
+        rows = sim.logger.array[::options['stride']].astype(np.float32)
+        trajectory = zlib.compress(rows.tobytes(), 6)
+    return metrics, trajectory, sim.logger.fieldnames
+
+
+def _run_chunk(scenario, chunk, options):
+    """One task: several scenarios run back to back in a worker process"""
+    return [_run_one(scenario, params, options) for params in chunk]
+
+
+def run_batch(scenario, params, duration, dt=0.01, num_drones=1, metrics=None,
+              trajectories=False, stride=10, max_workers=None, chunk_size=None, integrator=None):
+    """Run one headless simulation per row of `params` over a process pool
+
+    `params` is a dict of equal-length arrays (see parameter_grid / parameter_samples).
+    Each run builds a HeadlessSimulator, applies any DroneParameters fields (mass,
+    max_thrust, Ixx, ...) named in its row to every drone, calls scenario(sim, row) to
+    register controllers and initial state, steps for `duration` simulated seconds and
+    reduces the run with metrics(sim) -> dict of scalars (default_metrics if None).
+    `scenario` and `metrics` must be picklable, i.e. module-level functions.
+    `integrator` is an integrators name ('euler', 'rk4', 'rk45'). max_workers=0 runs
+    everything in this process.
+    """
+    values = {name: np.asarray(column).tolist() for name, column in params.items()}
+    count = len(next(iter(values.values()))) if values else 0
+    rows = [{name: column[i] for name, column in values.items()} for i in range(count)]
+    options = dict(duration=duration, dt=dt, num_drones=num_drones, metrics=metrics,
+                   trajectories=trajectories, stride=stride, integrator=integrator)
+
+    workers = os.cpu_count() if max_workers is None else max_workers
+    if chunk_size is None:
+        # A few chunks per worker: enough to balance uneven runs, few enough to keep IPC cheap
+        chunk_size = max(1, count // (4 * max(workers, 1)))
+    chunks = [rows[i:i + chunk_size] for i in range(0, count, chunk_size)]
+
+    results = [None] * len(chunks)
+    if workers == 0:
+        for k, chunk in enumerate(chunks):
+            results[k] = _run_chunk(scenario, chunk, options)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded number of chunks in flight instead of queuing them all at once
+            pending = {}
+            todo = iter(enumerate(chunks))
+            for k, chunk in itertools.islice(todo, 2 * workers):
+                pending[pool.submit(_run_chunk, scenario, chunk, options)] = k
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+                for k, chunk in itertools.islice(todo, len(done)):
+                    pending[pool.submit(_run_chunk, scenario, chunk, options)] = k
+
+    runs = [run for chunk in results for run in chunk]
+    metric_names = list(runs[0][0]) if runs else []
+    columns = {name: np.array([run[0][name] for run in runs]) for name in metric_names}
+    fieldnames = runs[0][2] if runs else None
+    return BatchResult(params, columns, [run[1] for run in runs] if trajectories else None, fieldnames)
@@ -54,4 +54,33 @@ class Camera:
             self.state.position[1], self.state.position[0], self.state.position[2],
             center[1], center[0], center[2],
             0, 0, -1
-        )
\ No newline at end of file
+        )
+
+
+class OnboardCamera(Camera):
+    """Camera fixed to a drone: looks along body x, tilted down by `tilt` degrees, and
+    rolls with it (up is the tilted body -z)"""
+
+    def __init__(self, tilt=0.0):
+        self.state = TransformState()
+        t = np.deg2rad(tilt)
+        # Body frame is x forward, y right, z down
+        self.mount_forward = np.array([np.cos(t), 0.0, np.sin(t)])
+        self.mount_up = np.array([np.sin(t), 0.0, -np.cos(t)])
+        self.forward = self.mount_forward.copy()
+        self.up = self.mount_up.copy()
+
+    def set_pose(self, position, R):
+        """Follow a drone at `position` with body -> world rotation `R`"""
+        self.state.position[:] = position
+        self.forward = R @ self.mount_forward
+        self.up = R @ self.mount_up
+
+    def apply(self):
+        eye = self.state.position
+        center = eye + self.forward
+        gluLookAt(
+            eye[1], eye[0], eye[2],
+            center[1], center[0], center[2],
+            self.up[1], self.up[0], self.up[2]
+        )
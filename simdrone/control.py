@@ -14,6 +14,8 @@
 # limitations under the License.
 import numpy as np
 
+from utils import *
+
 
 
 
@@ -37,4 +39,131 @@ class PIDController:
 
     def reset(self):
         self.integral = 0.0
-        self.prev_error = 0.0
\ No newline at end of file
+        self.prev_error = 0.0
+
+
+class PIDBank:
+    """Many independent PID loops stored as arrays and updated in one vectorized call
+
+    Every parameter broadcasts to `shape`, e.g. (N,) for an altitude loop per drone or
+    (N,3) for attitude. The derivative acts on the measurement (no kick on setpoint
+    changes) and goes through a first-order low-pass with time constant `derivative_tau`.
+    The integral is clamped per element to +-`integral_limit` and the output to
+    `output_limits`.
+    """
+
+    def __init__(self, shape, kp, ki, kd, setpoint=0.0, integral_limit=10.0,
+                 output_limits=(-np.inf, np.inf), derivative_tau=0.0):
+        def full(value):
+            return np.array(np.broadcast_to(value, shape), dtype=float)
+
+        self.shape = shape
+        self.kp = full(kp)
+        self.ki = full(ki)
+        self.kd = full(kd)
+        self.setpoint = full(setpoint)
+        self.integral_limit = full(integral_limit)
+        self.output_min = full(output_limits[0])
+        self.output_max = full(output_limits[1])
+        self.derivative_tau = derivative_tau
+
+        self.integral = np.zeros(shape)
+        self.derivative = np.zeros(shape)
+        self.prev_measurement = np.zeros(shape)
+        self.output = np.zeros(shape)
+        self._error = np.zeros(shape)
+        self._rate = np.zeros(shape)
+        # Loops that have a previous measurement to differentiate against
+        self._started = np.zeros(shape, dtype=bool)
+
+    def update(self, measurement, dt, rate=None, out=None):
+        """One step of every loop; `rate` is d(measurement)/dt when it is measured directly
+
+        Returns `out` (or the bank's own output buffer, overwritten on the next call).
+        """
+        error = np.subtract(self.setpoint, measurement, out=self._error)
+
+        self.integral += error * dt
+        np.clip(self.integral, -self.integral_limit, self.integral_limit, out=self.integral)
+
+        # Derivative on measurement, so setpoint steps don't kick the output
+        if rate is not None:
+            np.negative(rate, out=self._rate)
+        elif dt > 0:
+            np.subtract(self.prev_measurement, measurement, out=self._rate)
+            self._rate /= dt
+            # First sample since a reset: no rate yet rather than a jump from zero
+            self._rate *= self._started
+        else:
+            self._rate.fill(0.0)
+        np.copyto(self.prev_measurement, measurement)
+        self._started.fill(True)
+
+        if self.derivative_tau > 0:
+            self.derivative += (self._rate - self.derivative) * (dt / (self.derivative_tau + dt))
+        else:
+            np.copyto(self.derivative, self._rate)
+
+        out = self.output if out is None else out
+        np.multiply(self.kp, error, out=out)
+        out += self.ki * self.integral
+        out += self.kd * self.derivative
+        return np.clip(out, self.output_min, self.output_max, out=out)
+
+    def reset(self, index=slice(None)):
+        self.integral[index] = 0.0
+        self.derivative[index] = 0.0
+        self.prev_measurement[index] = 0.0
+        self._started[index] = False
+
+
+class SwarmController:
+    """Altitude and attitude hold for a whole SwarmState, writing its thrust and torques
+
+    Set `altitude.setpoint` (metres above ground, (N,)) and the attitude with
+    set_attitude (pitch, yaw, roll in degrees like `rotation`, (N,3)); register it with
+    HeadlessSimulator.add_controller(controller, rate_hz) to run it in the physics loop.
+    """
+
+    def __init__(self, swarm, altitude=0.0, attitude=0.0):
+        n = len(swarm)
+        self.swarm = swarm
+        self.altitude = PIDBank((n,), kp=0.12, ki=0.02, kd=0.12, setpoint=altitude,
+                                integral_limit=1.0, output_limits=(-1.0, 1.0), derivative_tau=0.02)
+        # Roll, pitch, yaw: the body x, y, z axes torques act about. Gains per degree.
+        self.attitude = PIDBank((n, 3), kp=0.04, ki=0.005, kd=0.01,
+                                integral_limit=20.0, output_limits=(-1.0, 1.0), derivative_tau=0.005)
+        self.set_attitude(attitude)
+        self._altitude = np.zeros(n)
+        self._attitude = np.zeros((n, 3))
+        self._rate = np.zeros((n, 3))
+
+    def set_attitude(self, rotation, index=slice(None)):
+        """Attitude setpoint as pitch, yaw, roll degrees"""
+        rotation = np.broadcast_to(rotation, self.attitude.setpoint[index].shape)
+        self.attitude.setpoint[index] = rotation[..., [2, 0, 1]]
+
+    def __call__(self, sim, t, dt):
+        self.update(sim.swarm, dt)
+
+    def update(self, swarm, dt):
+        np.negative(swarm.position[:, 2], out=self._altitude)  # NED: altitude is -z
+        lift = self.altitude.update(self._altitude, dt)
+        # Hover feed-forward from each drone's own mass and thrust
+        lift += swarm.mass * GRAVITY / swarm.max_thrust
+
+        # Tilted thrust loses lift; divide by the z component of the body axis
+        R = swarm.get_rotation_matrices()
+        tilt = np.maximum(R[:, 2, 2], 0.2)
+        np.clip(lift / tilt, 0.0, 1.0, out=swarm.thrust)
+
+        # Measured roll, pitch, yaw, with yaw unwrapped to within 180 degrees of its setpoint
+        measured = self._attitude
+        measured[:, 0] = swarm.rotation[:, 2]
+        measured[:, 1] = swarm.rotation[:, 0]
+        yaw_setpoint = self.attitude.setpoint[:, 2]
+        measured[:, 2] = yaw_setpoint - (yaw_setpoint - swarm.rotation[:, 1] + 180.0) % 360.0 + 180.0
+
+        # Body rates are the measurement's derivative for small angles
+        np.degrees(swarm.angular_velocity, out=self._rate)
+        self.attitude.update(measured, dt, rate=self._rate, out=swarm.torques)
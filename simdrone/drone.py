@@ -12,67 +12,59 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import pygame
-from pygame.locals import *
-from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
 
 from utils import *
+from swarm import SwarmState, SwarmTransformState
 
 
 
 class Drone:
+    """Thin view of one row of a SwarmState"""
 
-    def __init__(self):
-        self.state = TransformState()
-        self.thrust = 0.0
-        self.torques = np.zeros(3)
+    def __init__(self, swarm=None, index=0):
+        if swarm is None:
+            swarm = SwarmState(1)
+        self.swarm = swarm
+        self.index = index
+        self.state = SwarmTransformState(swarm, index)
 
-    def reset(self):
-        self.state.position = np.array([0.0, 0.0, -0.5])
-        self.state.velocity = np.zeros(3)
-        self.state.rotation = np.zeros(3)
-        self.state.angular_velocity = np.zeros(3)
-        self.thrust = 0.0
-        self.torques = np.zeros(3)
+    @property
+    def thrust(self):
+        return self.swarm.thrust[self.index]
 
-    def set_control(self, thrust=0.0, roll=0.0, pitch=0.0, yaw=0.0):
-        self.thrust = np.clip(thrust, 0.0, 1.0)
-        self.torques = np.clip(np.array([roll, pitch, yaw]), -1.0, 1.0)
+    @thrust.setter
+    def thrust(self, value):
+        self.swarm.thrust[self.index] = value
 
-    def update_dynamics(self, dt):
-        # Thrust force in world frame
-        R = self.state.get_rotation_matrix()
-        thrust_body = np.array([0.0, 0.0, -self.thrust * MAX_THRUST])  # Negative for lift (body -Z up)
-        thrust_world = R @ thrust_body
+    @property
+    def torques(self):
+        return self.swarm.torques[self.index]
 
-        # Gravity
-        gravity = np.array([0.0, 0.0, GRAVITY * MASS])  # +Z down
+    @torques.setter
+    def torques(self, value):
+        self.swarm.torques[self.index] = value
 
-        # Linear acceleration
-        accel = (thrust_world + gravity) / MASS
+    @property
+    def parameters(self):
+        return self.swarm.get_parameters(self.index)
 
-        # Angular acceleration
-        ang_accel = np.array([
-            self.torques[0] * MAX_TORQUE / IXX,
-            self.torques[1] * MAX_TORQUE / IYY,
-            self.torques[2] * MAX_TORQUE / IZZ
-        ])
+    @parameters.setter
+    def parameters(self, value):
+        self.swarm.set_parameters(value, index=self.index)
 
-        self.state.velocity += accel * dt
-        
-        # Integrate
-        # Integrate
-        self.state.position += self.state.velocity * dt
+    def reset(self):
+        self.state.position = [0.0, 0.0, -0.5]
+        self.state.velocity = 0.0
+        self.state.rotation = 0.0
+        self.state.angular_velocity = 0.0
+        self.thrust = 0.0
+        self.torques = 0.0
 
-        # Ground collision (NED: +Z is down, ground at Z=0)
-        if self.state.position[2] > -0.6:
-            self.state.position[2] = -0.6
-            # If moving down (positive velocity), reset to 0
-            if self.state.velocity[2] > 0:
-                self.state.velocity[2] = 0
+    def set_control(self, thrust=0.0, roll=0.0, pitch=0.0, yaw=0.0):
+        self.thrust = np.clip(thrust, 0.0, 1.0)
+        self.torques = np.clip(np.array([roll, pitch, yaw]), -1.0, 1.0)
 
-        self.state.angular_velocity += ang_accel * dt
-        self.state.rotation += np.degrees(self.state.angular_velocity) * dt
-        self.state.rotation[0] = np.clip(self.state.rotation[0], -89.9, 89.9)
+    def update_dynamics(self, dt):
+        # Steps this drone alone; Simulator steps the whole swarm at once
+        self.swarm.step(dt, slice(self.index, self.index + 1))
@@ -0,0 +1,125 @@
+# headless.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from drone import Drone
+from swarm import SwarmState, SwarmSnapshots
+from logger import Logger
+
+
+
+
+class HeadlessSimulator:
+    """Physics and logging only: no pygame, OpenGL or Qt, no wall-clock throttling"""
+
+    def __init__(self, num_drones=1, dt=0.01, logger=None, parameters=None, integrator=None):
+        self.dt = dt
+        # `parameters`: one DroneParameters for every drone or a list with one each
+        # `integrator`: 'euler' (default), 'rk4', 'rk45' or an integrators instance
+        self.swarm = SwarmState(num_drones, parameters=parameters, integrator=integrator)
+        self.drones = [Drone(self.swarm, i) for i in range(num_drones)]
+        self.logger = logger if logger is not None else Logger()
+        # State after every step, for readers outside the simulation thread
+        self.snapshots = SwarmSnapshots(num_drones)
+        self.snapshots.publish(self.swarm, 0.0)
+        self.elapsed_time = 0.0
+        self.running = True
+        self.step_count = 0
+        # [fn, period in steps] pairs, see add_controller and add_sensor
+        self.controllers = []
+        self.sensors = []
+        # Optional spatial.DroneCollisions and world.World, resolved after every step
+        self.collisions = None
+        self.world = None
+
+    def add_controller(self, fn, rate_hz=None):
+        """Call fn(sim, t, dt) every 1/rate_hz simulated seconds (every step if None)
+
+        Controllers run inside step(), before the physics, in registration order. The
+        rate is rounded to a whole number of physics steps and `dt` is the resulting
+        control period, so the timing is exact however fast the loop itself runs.
+        """
+        self.controllers.append([fn, self._period(rate_hz, 'Controller')])
+        return fn
+
+    def remove_controller(self, fn):
+        self.controllers = [c for c in self.controllers if c[0] is not fn]
+
+    def add_sensor(self, sensor, rate_hz=None):
+        """Update a sensors.Sensor every 1/rate_hz simulated seconds (its own rate_hz if None)
+
+        Sensors run inside step(), after the physics and collisions, so controllers see
+        the reading of the previous step. A first reading is taken right away.
+        """
+        rate_hz = sensor.rate_hz if rate_hz is None else rate_hz
+        period = self._period(rate_hz, 'Sensor')
+        sensor.reset(self)
+        sensor(self, self.elapsed_time, period * self.dt)
+        self.sensors.append([sensor, period])
+        return sensor
+
+    def remove_sensor(self, sensor):
+        self.sensors = [s for s in self.sensors if s[0] is not sensor]
+
+    def _period(self, rate_hz, what):
+        """Whole number of physics steps between calls at rate_hz (every step if None)"""
+        period = 1 if rate_hz is None else round(1.0 / (rate_hz * self.dt))
+        if period < 1:
+            raise ValueError(f"{what} rate {rate_hz} Hz is above the physics rate {1.0 / self.dt:g} Hz")
+        return period
+
+    def step(self, dt=None):
+        """Run due controllers, advance physics by one fixed step and log it"""
+        dt = self.dt if dt is None else dt
+        for fn, period in self.controllers:
+            if self.step_count % period == 0:
+                fn(self, self.elapsed_time, period * dt)
+        self.swarm.step(dt)
+        if self.collisions is not None:
+            self.collisions.update(self.swarm)
+        if self.world is not None:
+            self.world.resolve(self.swarm)
+        if self.collisions is not None or self.world is not None:
+            # Separation may have pushed a drone into the ground
+            self.swarm.constrain()
+        self.step_count += 1
+        self.elapsed_time += dt
+        for sensor, period in self.sensors:
+            if self.step_count % period == 0:
+                sensor(self, self.elapsed_time, period * dt)
+        self.snapshots.publish(self.swarm, self.elapsed_time)
+        self.logger.log(self.elapsed_time, self.drones)
+
+    def run(self, steps=None, end_time=None, result_queue=None, as_rows=False):
+        """Step as fast as possible until `steps` are done, `end_time` is reached or `running` is cleared
+
+        Saves the log and returns Logger.contents(): the logged array, or a LogReader
+        over the segment directory for a streaming logger. Can be called repeatedly.
+        """
+        if steps is None and end_time is None:
+            raise ValueError("HeadlessSimulator.run needs steps or end_time")
+        if end_time is not None:
+            # Count steps up front so float accumulation can't add or drop one
+            remaining = round((end_time - self.elapsed_time) / self.dt)
+            steps = remaining if steps is None else min(steps, remaining)
+
+        for _ in range(steps):
+            if not self.running:
+                break
+            self.step()
+
+        self.logger.save()
+        data = self.logger.contents(as_rows)
+        if result_queue:
+            result_queue.put(data)
+        return data
@@ -0,0 +1,150 @@
+# integrators.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+
+
+
+
+class SemiImplicitEuler:
+    """First order, one force evaluation per step: velocities first, then positions
+
+    Cheapest per step and stable enough for real-time use at small dt.
+    """
+
+    def step(self, swarm, dt, index=slice(None)):
+        state = swarm.state[index]
+        accel, ang_accel = swarm.accelerations(state, index)
+
+        state[:, 3:6] += accel * dt
+        state[:, 0:3] += state[:, 3:6] * dt
+
+        # Rotate by the new body rates over dt (exact for constant w)
+        state[:, 10:13] += ang_accel * dt
+        swarm.rotate(state[:, 10:13] * dt, index)
+        swarm.constrain(index)
+
+
+class RK4:
+    """Classic fourth-order Runge-Kutta on the packed (N,13) state, four evaluations per step
+
+    Controls are held for the whole step. Far more accurate per CPU second than
+    Euler once dt is large enough that Euler needs several times as many steps.
+    """
+
+    def __init__(self):
+        self._k = None
+
+    def step(self, swarm, dt, index=slice(None)):
+        state = swarm.state[index]
+        if self._k is None or self._k.shape[1:] != state.shape:
+            self._k = np.empty((4,) + state.shape)
+        k = self._k
+        start = state.copy()
+
+        swarm.derivatives(start, index, out=k[0])
+        swarm.derivatives(start + k[0] * (dt / 2), index, out=k[1])
+        swarm.derivatives(start + k[1] * (dt / 2), index, out=k[2])
+        swarm.derivatives(start + k[2] * dt, index, out=k[3])
+
+        state[:] = start + (k[0] + 2 * k[1] + 2 * k[2] + k[3]) * (dt / 6)
+        swarm.constrain(index)
+
+
+class RK45:
+    """Adaptive Dormand-Prince 5(4) for offline runs: substeps each dt to meet a tolerance
+
+    One substep size is shared by the batch and chosen from the worst drone's error
+    estimate (RMS over its 13 components, scaled by atol + rtol * |y|). The last size
+    is kept for the next call, so smooth flight takes few substeps per step.
+    """
+
+    C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0])
+    A = [
+        [],
+        [1 / 5],
+        [3 / 40, 9 / 40],
+        [44 / 45, -56 / 15, 32 / 9],
+        [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+        [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+        [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+    ]
+    B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+    # Fifth minus fourth order weights, i.e. the embedded error estimate
+    E = B - np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+    def __init__(self, rtol=1e-6, atol=1e-8, min_step=1e-6, max_substeps=10000):
+        self.rtol = rtol
+        self.atol = atol
+        self.min_step = min_step
+        self.max_substeps = max_substeps
+        self.h = None
+        self.substeps = 0
+        self.rejected = 0
+
+    def step(self, swarm, dt, index=slice(None)):
+        state = swarm.state[index]
+        k = np.empty((7,) + state.shape)
+        t = 0.0
+        # Proposed substep; the one taken is clipped to what is left of dt
+        h = dt if self.h is None else self.h
+        for _ in range(self.max_substeps):
+            if t >= dt * (1 - 1e-12):
+                break
+            step = min(h, dt - t)
+            y = state.copy()
+            swarm.derivatives(y, index, out=k[0])
+            for s in range(1, 7):
+                stage = y + step * np.tensordot(self.A[s], k[:s], axes=1)
+                swarm.derivatives(stage, index, out=k[s])
+            # k[6] is evaluated at y_new (the A[6] row equals B), so y_new is that stage
+            error = step * np.tensordot(self.E, k, axes=1)
+            scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(stage))
+            norm = np.sqrt(np.mean((error / scale) ** 2, axis=1)).max() if len(y) else 0.0
+
+            accepted = norm <= 1.0 or step <= self.min_step
+            if accepted:
+                state[:] = stage
+                swarm.constrain(index)
+                t += step
+                self.substeps += 1
+            else:
+                self.rejected += 1
+            # Standard step size controller with a safety factor and bounded change
+            factor = 5.0 if norm == 0 else min(5.0, max(0.2, 0.9 * norm ** -0.2))
+            proposal = max(step * factor, self.min_step)
+            # An accepted step that was only short to land on dt says nothing against h
+            h = max(h, proposal) if accepted and step < h else proposal
+        self.h = h
+        if t < dt * (1 - 1e-12):
+            raise RuntimeError(f"RK45 used all {self.max_substeps} substeps and reached t = {t:g} of dt = {dt:g}; "
+                               f"loosen rtol/atol or raise max_substeps")
+
+
+INTEGRATORS = {
+    'euler': SemiImplicitEuler,
+    'rk4': RK4,
+    'rk45': RK45,
+}
+
+
+def make_integrator(integrator):
+    """An integrator instance from a name in INTEGRATORS, an instance, or None (Euler)"""
+    if integrator is None:
+        return SemiImplicitEuler()
+    if isinstance(integrator, str):
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {sorted(INTEGRATORS)}")
+        return INTEGRATORS[integrator]()
+    return integrator
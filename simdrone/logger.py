@@ -12,41 +12,330 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import csv
-import time
+import glob
+import json
 import os
+import queue
+import threading
+import time
+from itertools import islice
+import numpy as np
+
+from swarm import swarm_of
+
+
+
+
+class SegmentWriter:
+    """Writes fixed-size telemetry chunks as numbered .npy segments on a background thread
+
+    Chunks are handed over through a bounded queue and their buffers recycled, so
+    the sim only waits if the disk falls `max_pending` chunks behind. If a write
+    fails the thread stops, and its exception is raised from the next submit(),
+    acquire() or close() instead of leaving the sim waiting on a dead writer.
+    """
+
+    def __init__(self, directory, fieldnames, chunk_size=4096, max_pending=4):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.segments = 0
+        self.submitted = 0
+        self.error = None
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'schema.json'), 'w') as f:
+            json.dump({'fieldnames': list(fieldnames), 'chunk_size': chunk_size}, f)
+
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._free = queue.Queue()
+        for _ in range(max_pending + 1):
+            self._free.put(np.empty((chunk_size, len(fieldnames))))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+        if not self._thread.is_alive():
+            raise RuntimeError(f"Segment writer for {self.directory} has stopped")
+
+    def acquire(self):
+        while True:
+            self._check()
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def submit(self, buffer, rows):
+        while True:
+            self._check()
+            try:
+                self._pending.put((buffer, rows), timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        if buffer is not None:
+            self.submitted += 1
 
+    def sync(self):
+        """Wait until every submitted chunk is on disk"""
+        while self.segments < self.submitted:
+            self._check()
+            time.sleep(0.005)
 
+    def close(self):
+        if self._thread.is_alive():
+            self.submit(None, 0)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            while True:
+                buffer, rows = self._pending.get()
+                if buffer is None:
+                    break
+                path = os.path.join(self.directory, f'segment_{self.segments:06d}.npy')
+                # Write then rename, so a crash never leaves a truncated segment behind
+                with open(path + '.tmp', 'wb') as f:
+                    np.save(f, buffer[:rows])
+                os.replace(path + '.tmp', path)
+                self.segments += 1
+                self._free.put(buffer)
+        except BaseException as error:
+            self.error = error
 
 
 class Logger:
-    def __init__(self, filename=None):
+    """Columnar telemetry log: one float64 column per channel in a growable buffer
+
+    With stream=True, `filename` is a directory and full chunks of `capacity` rows
+    are flushed to .npy segments by a SegmentWriter instead of being kept in memory.
+    save() can be called any number of times and logging carries on after it;
+    close() ends the writer thread for good.
+    """
+
+    def __init__(self, filename=None, capacity=4096, stream=False):
         if filename is None:
-            filename = f"log_{int(time.time())}.csv"
+            filename = f"log_{int(time.time())}" if stream else f"log_{int(time.time())}.csv"
         self.filename = filename
-        self.data = []
+        self.stream = stream
+        self.writer = None
+        self.fieldnames = None
+        self.size = 0
+        self.flushed = 0
+        self._capacity = capacity
+        self._buffer = None
+        # status key -> (num_drones, width) column indices into a row
+        self._columns = None
+        self._swarm = None
+        self.closed = False
 
-    def log(self, timestamp, drones):
-        row = {'timestamp': timestamp}
+    def __len__(self):
+        return self.flushed + self.size
+
+    def _build_schema(self, drones):
+        fieldnames = ['timestamp']
+        columns = {}
         for i, drone in enumerate(drones):
-            status = drone.state.get_status()
-            # Flatten the dictionary
-            for key, value in status.items():
+            for key, value in drone.state.get_status().items():
+                # Flatten the dictionary
                 if hasattr(value, '__len__'):
-                    for j, v in enumerate(value):
-                        row[f'drone_{i}_{key}_{j}'] = v
+                    names = [f'drone_{i}_{key}_{j}' for j in range(len(value))]
                 else:
-                    row[f'drone_{i}_{key}'] = value
-        self.data.append(row)
+                    names = [f'drone_{i}_{key}']
+                columns.setdefault(key, []).append(np.arange(len(fieldnames), len(fieldnames) + len(names)))
+                fieldnames.extend(names)
+        self.fieldnames = fieldnames
+        self._columns = {key: np.array(cols) for key, cols in columns.items()}
+        if self.stream:
+            self.writer = SegmentWriter(self.filename, fieldnames, chunk_size=self._capacity)
+            self._buffer = self.writer.acquire()
+        else:
+            self._buffer = np.empty((self._capacity, len(fieldnames)))
+
+        # Drones that are rows 0..N-1 of one swarm can be logged straight from its arrays
+        self._swarm = swarm_of(drones)
+
+    def _flush(self):
+        self.writer.submit(self._buffer, self.size)
+        self.flushed += self.size
+        self.size = 0
+        self._buffer = self.writer.acquire()
+
+    def _grow(self):
+        buffer = np.empty((2 * len(self._buffer), self._buffer.shape[1]))
+        buffer[:self.size] = self._buffer[:self.size]
+        self._buffer = buffer
+
+    def log(self, timestamp, drones):
+        if self.closed:
+            raise RuntimeError(f"Logger for {self.filename} is closed")
+        if self.fieldnames is None:
+            self._build_schema(drones)
+        if self.size == len(self._buffer):
+            if self.writer is not None:
+                self._flush()
+            else:
+                self._grow()
+
+        row = self._buffer[self.size]
+        row[0] = timestamp
+        if self._swarm is not None:
+            for key, value in self._swarm.get_status().items():
+                row[self._columns[key]] = value
+        else:
+            for i, drone in enumerate(drones):
+                for key, value in drone.state.get_status().items():
+                    row[self._columns[key][i]] = value
+        self.size += 1
+
+    @property
+    def array(self):
+        """(rows, channels) view of the rows held in memory, columns named by `fieldnames`
+
+        That is everything logged so far, or only the unflushed tail when streaming.
+        """
+        if self._buffer is None:
+            return np.empty((0, 0))
+        return self._buffer[:self.size]
+
+    def column(self, name):
+        return self.array[:, self.fieldnames.index(name)]
+
+    def columns(self, key):
+        """(num_drones, width) indices into a row of the channels of status `key`, e.g.
+        log.array[:, log.columns('position')[:, 2]] is every drone's z"""
+        if self._columns is None:
+            raise KeyError(f"Nothing logged yet, so there is no column for {key!r}")
+        return self._columns[key]
+
+    def rows(self):
+        """Row dicts in the old Logger.data layout (builds Python objects, use for small logs)"""
+        if self.fieldnames is None:
+            return []
+        return [dict(zip(self.fieldnames, row)) for row in self.array.tolist()]
+
+    @property
+    def data(self):
+        return self.rows()
+
+    def contents(self, as_rows=False):
+        """Everything logged so far: the in-memory array (or row dicts), or when streaming
+        a LogReader over the segment directory (call save() first)"""
+        if not self.stream:
+            return self.rows() if as_rows else self.array
+        if as_rows:
+            raise ValueError("Row dicts are not available for a streamed log, use the LogReader")
+        return LogReader(self.filename) if self.flushed else np.empty((0, 0))
 
     def save(self):
-        if not self.data:
+        """Write out everything logged so far; logging may continue afterwards"""
+        if self.writer is not None:
+            # The partial chunk becomes a short segment and a fresh buffer takes over
+            if self.size:
+                self._flush()
+            self.writer.sync()
+            print(f"Log streamed to {self.filename} ({self.flushed} rows)")
+            return
+        if not self.size:
             return
-        
-        fieldnames = self.data[0].keys()
-        
-        with open(self.filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.data)
+
+        np.savetxt(self.filename, self.array, fmt='%.17g', delimiter=',',
+                   header=','.join(self.fieldnames), comments='')
         print(f"Log saved to {self.filename}")
+
+    def close(self):
+        """save(), then stop the segment writer; nothing more can be logged"""
+        if self.closed:
+            return
+        self.save()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.closed = True
+
+
+
+class LogReader:
+    """Memory-mapped random access to a recorded log
+
+    `path` is a streamed segment directory or a CSV written by Logger.save. A CSV is
+    converted once, chunk by chunk, into a segment directory next to it.
+    """
+
+    # Logger status keys -> SwarmState arrays
+    STATUS_FIELDS = {'position': 'position', 'velociaty': 'velocity', 'rotation': 'rotation'}
+
+    def __init__(self, path, chunk_size=4096):
+        directory = path
+        if not os.path.isdir(path):
+            directory = os.path.splitext(path)[0] + '_segments'
+            if not os.path.exists(os.path.join(directory, 'schema.json')):
+                self._convert_csv(path, directory, chunk_size)
+
+        with open(os.path.join(directory, 'schema.json')) as f:
+            self.fieldnames = json.load(f)['fieldnames']
+        self.directory = directory
+        self.segments = [np.load(p, mmap_mode='r')
+                         for p in sorted(glob.glob(os.path.join(directory, 'segment_*.npy')))]
+        if not self.segments:
+            raise ValueError(f"No telemetry segments in {directory}")
+        self.offsets = np.cumsum([0] + [len(s) for s in self.segments])
+        # First timestamp of each segment, for seeking without touching the others
+        self._starts = np.array([s[0, 0] for s in self.segments])
+
+        self.num_drones = 1 + max(int(name.split('_')[1]) for name in self.fieldnames[1:])
+        self._columns = {}
+        for key, name in self.STATUS_FIELDS.items():
+            cols = [[self.fieldnames.index(f'drone_{i}_{key}_{j}') for j in range(3)]
+                    for i in range(self.num_drones)]
+            self._columns[name] = np.array(cols)
+
+    @staticmethod
+    def _convert_csv(csv_path, directory, chunk_size):
+        with open(csv_path) as f:
+            fieldnames = f.readline().strip().split(',')
+            writer = SegmentWriter(directory + '.tmp', fieldnames, chunk_size=chunk_size)
+            while True:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    break
+                buffer = writer.acquire()
+                buffer[:len(lines)] = np.loadtxt(lines, delimiter=',', ndmin=2)
+                writer.submit(buffer, len(lines))
+            writer.close()
+        os.replace(directory + '.tmp', directory)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def start_time(self):
+        return float(self.segments[0][0, 0])
+
+    @property
+    def end_time(self):
+        return float(self.segments[-1][-1, 0])
+
+    def row(self, index):
+        k = np.searchsorted(self.offsets, index, side='right') - 1
+        return self.segments[k][index - self.offsets[k]]
+
+    def timestamp(self, index):
+        return float(self.row(index)[0])
+
+    def index_at(self, t):
+        """Last frame recorded at or before time `t`"""
+        k = max(np.searchsorted(self._starts, t, side='right') - 1, 0)
+        j = max(np.searchsorted(self.segments[k][:, 0], t, side='right') - 1, 0)
+        return int(self.offsets[k] + j)
+
+    def load(self, index, swarm):
+        """Copy frame `index` into the arrays of a SwarmState"""
+        row = self.row(index)
+        for name, cols in self._columns.items():
+            getattr(swarm, name)[:] = row[cols]
+        # Logs hold Euler angles; rebuild the attitude quaternions from them
+        swarm.set_rotation(swarm.rotation)
@@ -0,0 +1,197 @@
+# meshes.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import ctypes
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+
+
+
+INSTANCED_VERTEX_SHADER = """
+#version 120
+attribute vec3 position;
+attribute vec3 color;
+attribute vec4 model0;
+attribute vec4 model1;
+attribute vec4 model2;
+attribute vec4 model3;
+varying vec3 v_color;
+void main() {
+    mat4 model = mat4(model0, model1, model2, model3);
+    gl_Position = gl_ModelViewProjectionMatrix * model * vec4(position, 1.0);
+
+    // Same result as the fixed-function path: GL_LIGHT0 with color material and
+    // the default (0, 0, 1) normal, which is all the meshes ever had
+    vec3 eye = (gl_ModelViewMatrix * model * vec4(position, 1.0)).xyz;
+    vec3 normal = normalize(gl_NormalMatrix * mat3(model) * vec3(0.0, 0.0, 1.0));
+    vec3 light = normalize(gl_LightSource[0].position.xyz - eye);
+    float diffuse = max(dot(normal, light), 0.0);
+    v_color = color * (gl_LightModel.ambient.rgb + gl_LightSource[0].ambient.rgb
+                       + diffuse * gl_LightSource[0].diffuse.rgb);
+}
+"""
+
+INSTANCED_FRAGMENT_SHADER = """
+#version 120
+varying vec3 v_color;
+void main() {
+    gl_FragColor = vec4(v_color, 1.0);
+}
+"""
+
+
+def grid_vertices(size=40, step=2):
+    """Line pairs of the ground grid, same layout as the old immediate-mode draw_grid"""
+    ticks = np.arange(-size, size + 1, step, dtype=float)
+    n = len(ticks)
+    vertices = np.zeros((n, 4, 3))
+    vertices[:, 0, :2] = np.column_stack([ticks, np.full(n, -size)])
+    vertices[:, 1, :2] = np.column_stack([ticks, np.full(n, size)])
+    vertices[:, 2, :2] = np.column_stack([np.full(n, -size), ticks])
+    vertices[:, 3, :2] = np.column_stack([np.full(n, size), ticks])
+    vertices = vertices.reshape(-1, 3)
+    colors = np.tile([0.35, 0.35, 0.4], (len(vertices), 1))
+    return vertices, colors
+
+
+def cube_vertices(size=1.2, color=(0.85, 0.25, 0.25)):
+    """Quads of an axis-aligned cube centred on the origin"""
+    h = size / 2
+    vertices = np.array([
+        [-h,-h, h], [ h,-h, h], [ h, h, h], [-h, h, h],
+        [-h,-h,-h], [-h, h,-h], [ h, h,-h], [ h,-h,-h],
+        [-h,-h, h], [-h, h, h], [-h, h,-h], [-h,-h,-h],
+        [ h,-h, h], [ h,-h,-h], [ h, h,-h], [ h, h, h],
+        [-h, h, h], [ h, h, h], [ h, h,-h], [-h, h,-h],
+        [-h,-h, h], [-h,-h,-h], [ h,-h,-h], [ h,-h, h],
+    ])
+    colors = np.tile(color, (len(vertices), 1))
+    return vertices, colors
+
+
+def axes_vertices(length=1.5):
+    """Red/green/blue line pairs along +X/+Y/+Z"""
+    vertices = np.zeros((6, 3))
+    vertices[1, 0] = vertices[3, 1] = vertices[5, 2] = length
+    colors = np.repeat(np.eye(3), 2, axis=0)
+    return vertices, colors
+
+
+class MeshBuffer:
+    """Static VBO of interleaved float32 xyz + rgb vertices, created once and redrawn"""
+
+    STRIDE = 6 * 4
+
+    def __init__(self, vertices, colors, mode):
+        data = np.ascontiguousarray(np.hstack([vertices, colors]), dtype=np.float32)
+        self.count = len(data)
+        self.mode = mode
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        """Draw through the fixed-function client arrays, under the current modelview"""
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, self.STRIDE, ctypes.c_void_p(0))
+        glColorPointer(3, GL_FLOAT, self.STRIDE, ctypes.c_void_p(12))
+        glDrawArrays(self.mode, 0, self.count)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.vbo])
+
+
+class InstancedRenderer:
+    """Draws a MeshBuffer once per row of an (N,16) column-major model-matrix buffer
+
+    One glDrawArraysInstanced per mesh, whatever N is. Needs GLSL 1.20 and instanced
+    arrays (GL 3.3 / ARB_instanced_arrays); check supported() with a live context.
+    """
+
+    POSITION, COLOR, MODEL = 0, 1, 2
+
+    @staticmethod
+    def supported():
+        try:
+            return bool(glDrawArraysInstanced) and bool(glVertexAttribDivisor) and bool(glCreateProgram)
+        except Exception:
+            return False
+
+    def __init__(self):
+        vertex = shaders.compileShader(INSTANCED_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fragment = shaders.compileShader(INSTANCED_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.program = glCreateProgram()
+        glAttachShader(self.program, vertex)
+        glAttachShader(self.program, fragment)
+        glBindAttribLocation(self.program, self.POSITION, 'position')
+        glBindAttribLocation(self.program, self.COLOR, 'color')
+        for k in range(4):
+            glBindAttribLocation(self.program, self.MODEL + k, f'model{k}')
+        glLinkProgram(self.program)
+        if glGetProgramiv(self.program, GL_LINK_STATUS) != GL_TRUE:
+            raise RuntimeError(glGetProgramInfoLog(self.program))
+        glDeleteShader(vertex)
+        glDeleteShader(fragment)
+
+        self.instance_vbo = glGenBuffers(1)
+        self.capacity = 0
+        self.count = 0
+
+    def upload(self, matrices):
+        """matrices: (N,16) float32, each row a column-major 4x4 model matrix"""
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        if matrices.nbytes > self.capacity:
+            glBufferData(GL_ARRAY_BUFFER, matrices.nbytes, matrices, GL_STREAM_DRAW)
+            self.capacity = matrices.nbytes
+        else:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, matrices.nbytes, matrices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.count = len(matrices)
+
+    def draw(self, mesh, count=None):
+        """Draw the first `count` instances (all uploaded ones by default)"""
+        count = self.count if count is None else count
+        if not count:
+            return
+        glUseProgram(self.program)
+        glBindBuffer(GL_ARRAY_BUFFER, mesh.vbo)
+        glEnableVertexAttribArray(self.POSITION)
+        glVertexAttribPointer(self.POSITION, 3, GL_FLOAT, GL_FALSE, mesh.STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(self.COLOR)
+        glVertexAttribPointer(self.COLOR, 3, GL_FLOAT, GL_FALSE, mesh.STRIDE, ctypes.c_void_p(12))
+
+        # A mat4 attribute is four vec4 columns, each advancing once per instance
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        for k in range(4):
+            glEnableVertexAttribArray(self.MODEL + k)
+            glVertexAttribPointer(self.MODEL + k, 4, GL_FLOAT, GL_FALSE, 64, ctypes.c_void_p(16 * k))
+            glVertexAttribDivisor(self.MODEL + k, 1)
+
+        glDrawArraysInstanced(mesh.mode, 0, mesh.count, count)
+
+        for k in range(4):
+            glVertexAttribDivisor(self.MODEL + k, 0)
+            glDisableVertexAttribArray(self.MODEL + k)
+        glDisableVertexAttribArray(self.COLOR)
+        glDisableVertexAttribArray(self.POSITION)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glUseProgram(0)
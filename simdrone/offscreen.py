@@ -0,0 +1,471 @@
+# offscreen.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import ctypes
+import os
+import queue
+import subprocess
+import threading
+import numpy as np
+import OpenGL.platform
+from OpenGL.GL import *
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as glReadPixelsRaw
+
+from camera import Camera, OnboardCamera
+from render import Rendering
+from sensors import Sensor
+
+
+
+
+class OffscreenContext:
+    """GL context without a window: EGL surfaceless (Mesa, NVIDIA) or OSMesa
+
+    PyOpenGL binds its platform on first import, so PYOPENGL_PLATFORM must be 'egl' or
+    'osmesa' before anything imports OpenGL (simdrone picks 'egl' on Linux without a display).
+    """
+
+    def __init__(self, width=1280, height=720):
+        self.width = width
+        self.height = height
+        platform = type(OpenGL.platform.PLATFORM).__name__
+        if 'EGL' in platform:
+            self._init_egl()
+        elif 'OSMesa' in platform:
+            self._init_osmesa()
+        else:
+            raise RuntimeError(f"Offscreen rendering needs PYOPENGL_PLATFORM=egl or osmesa, got {platform}")
+
+    def _init_egl(self):
+        from OpenGL import EGL
+        os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor))
+        attributes = (EGL.EGLint * 5)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        EGL.eglChooseConfig(self.display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count))
+        if not count.value:
+            raise RuntimeError("No EGL config with desktop OpenGL support")
+        # Desktop GL (compatibility profile), since the renderer uses the fixed-function pipeline
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, None)
+        # Surfaceless: everything is drawn into a Framebuffer
+        self._egl = EGL
+        self.make_current()
+
+    def _init_osmesa(self):
+        from OpenGL import osmesa, arrays
+        self.context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        # OSMesa always renders to a client buffer; we still draw into a Framebuffer on top
+        self._osmesa_buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        self._egl = None
+        self.make_current()
+
+    def make_current(self):
+        """Bind this context to the calling thread (needed when several are alive)"""
+        if self._egl is not None:
+            EGL = self._egl
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self.context)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaMakeCurrent(self.context, self._osmesa_buffer, GL_UNSIGNED_BYTE, self.width, self.height)
+
+    def close(self):
+        if self._egl is not None:
+            EGL = self._egl
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            # No eglTerminate: the default display is shared by every context in the process
+            EGL.eglDestroyContext(self.display, self.context)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self.context)
+
+
+class Framebuffer:
+    """FBO with an RGBA8 colour and a 24-bit depth renderbuffer"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.fbo = glGenFramebuffers(1)
+        self.renderbuffers = glGenRenderbuffers(2)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.renderbuffers[0])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.renderbuffers[0])
+        glBindRenderbuffer(GL_RENDERBUFFER, self.renderbuffers[1])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.renderbuffers[1])
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Incomplete offscreen framebuffer")
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+    def bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    def delete(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glDeleteRenderbuffers(2, self.renderbuffers)
+        glDeleteFramebuffers(1, [self.fbo])
+
+
+class PixelReader:
+    """Asynchronous glReadPixels through a ring of pixel pack buffers
+
+    read() starts the transfer of the current framebuffer and returns the frame started
+    `count - 1` calls earlier (None until the ring is full), so the CPU never waits on
+    the transfer it just queued. Frames are copied into buffers from acquire(), e.g.
+    FrameWriter.acquire.
+    """
+
+    def __init__(self, width, height, acquire, count=2):
+        self.width = width
+        self.height = height
+        self.size = width * height * 4
+        self.acquire = acquire
+        self.pbos = glGenBuffers(count)
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.index = 0
+        self.pending = 0
+
+    def _start(self):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[self.index])
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        # With a pack buffer bound the pointer is an offset, and the call returns at once
+        glReadPixelsRaw(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        self.index = (self.index + 1) % len(self.pbos)
+        self.pending += 1
+
+    def _finish(self):
+        # Oldest pending transfer sits `pending` slots behind the next write index
+        pbo = self.pbos[(self.index - self.pending) % len(self.pbos)]
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        frame = self.acquire()
+        pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.size, GL_MAP_READ_BIT)
+        ctypes.memmove(frame.ctypes.data, pointer, self.size)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        self.pending -= 1
+        return frame
+
+    def read(self):
+        frame = self._finish() if self.pending == len(self.pbos) - 1 else None
+        self._start()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frame
+
+    def drain(self):
+        """Frames still in flight, oldest first"""
+        frames = []
+        while self.pending:
+            frames.append(self._finish())
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frames
+
+    def delete(self):
+        glDeleteBuffers(len(self.pbos), self.pbos)
+
+
+class FrameWriter:
+    """Writes RGBA frames on a background thread
+
+    `path` picks the output: a video file (.mp4, .mkv, .webm, .avi, .mov) is streamed to
+    an ffmpeg subprocess, a .rgba/.raw file gets the frames appended back to back, and
+    anything else is a directory of numbered PNGs. Frames arrive bottom-up, as GL reads
+    them; buffers are handed back to `pool` once written. If the thread fails (ffmpeg
+    exits, the disk fills up) its exception is raised from the next acquire(), put()
+    or close(), so the recorder never blocks on a pool that will not refill.
+    """
+
+    VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.avi', '.mov')
+
+    def __init__(self, path, width, height, fps=30, pool_size=4):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = 0
+        self.error = None
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(np.empty((height, width, 4), dtype=np.uint8))
+        self._queue = queue.Queue(maxsize=pool_size)
+
+        extension = os.path.splitext(path)[1].lower()
+        self._process = None
+        self._raw = None
+        if extension in self.VIDEO_EXTENSIONS:
+            self._process = subprocess.Popen([
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps),
+                '-i', '-', '-vf', 'vflip', '-pix_fmt', 'yuv420p', path,
+            ], stdin=subprocess.PIPE)
+        elif extension in ('.rgba', '.raw'):
+            self._raw = open(path, 'wb')
+        else:
+            os.makedirs(path, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+        if not self._thread.is_alive():
+            raise RuntimeError(f"Frame writer for {self.path} has stopped")
+        if self._process is not None and self._process.poll() is not None:
+            raise RuntimeError(f"ffmpeg exited with code {self._process.returncode} while writing {self.path}")
+
+    def acquire(self):
+        """A free frame buffer, waiting for the writer to return one"""
+        while True:
+            self._check()
+            try:
+                return self.pool.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def put(self, frame):
+        while True:
+            self._check()
+            try:
+                return self._queue.put(frame, timeout=0.1)
+            except queue.Full:
+                pass
+
+    def close(self):
+        try:
+            if self._thread.is_alive():
+                self.put(None)
+                self._thread.join()
+        finally:
+            if self._process is not None:
+                try:
+                    self._process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                self._process.wait()
+            if self._raw is not None:
+                self._raw.close()
+        if self.error is not None:
+            raise self.error
+        if self._process is not None and self._process.returncode:
+            raise RuntimeError(f"ffmpeg exited with code {self._process.returncode} while writing {self.path}")
+
+    def _run(self):
+        import matplotlib.image
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is None:
+                    break
+                if self._process is not None:
+                    # ffmpeg flips it back (vflip), so no copy here
+                    self._process.stdin.write(frame.data)
+                elif self._raw is not None:
+                    self._raw.write(frame[::-1].tobytes())
+                else:
+                    matplotlib.image.imsave(os.path.join(self.path, f'frame_{self.frames:06d}.png'), frame[::-1])
+                self.frames += 1
+                self.pool.put(frame)
+        except BaseException as error:
+            self.error = error
+
+
+class VideoRecorder:
+    """Renders a HeadlessSimulator offscreen at a fixed simulated frame rate
+
+    Frame k is drawn at the physics step nearest to k/fps simulated seconds after the
+    recorder was created, so when 1/fps is not a whole number of steps the frames
+    alternate between the two nearest counts and the video still plays in real time.
+    Frames are drawn with Rendering.render_scene (plus the plot overlay when a
+    plotter is given), so the result does not depend on how fast the machine is.
+    """
+
+    def __init__(self, sim, path, width=1280, height=720, fps=30, camera=None, plotter=None, plot_fraction=0.35):
+        self.sim = sim
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.camera = camera if camera is not None else Camera()
+        self.plotter = plotter
+        self.plot_fraction = plot_fraction
+        if fps * sim.dt > 1.0:
+            raise ValueError(f"Video rate {fps} fps is above the physics rate {1.0 / sim.dt:g} Hz")
+        self.frames = 0
+        self._start_step = sim.step_count
+
+        self.context = OffscreenContext(width, height)
+        self.framebuffer = Framebuffer(width, height)
+        self.renderer = Rendering()
+        self.renderer.init_gl_state()
+        self.writer = FrameWriter(path, width, height, fps)
+        self.reader = PixelReader(width, height, self.writer.acquire)
+
+    def render_frame(self):
+        self.context.make_current()
+        self.framebuffer.bind()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        if self.plotter is None:
+            self.renderer.set_perspective(self.width, self.height)
+            self.renderer.render_scene(self.camera, self.sim.drones, clear=False, world=self.sim.world)
+        else:
+            plot_w = int(self.width * self.plot_fraction)
+            sim_w = self.width - plot_w
+            self.renderer.set_perspective(sim_w, self.height)
+            self.renderer.render_scene(self.camera, self.sim.drones, clear=False, world=self.sim.world)
+
+            buf, w, h = self.plotter.render_to_buffer()
+            self.renderer.update_plot_texture(buf, w, h)
+            glViewport(0, 0, self.width, self.height)
+            self.renderer.draw_plot_overlay(sim_w, 0, plot_w, self.height, self.width, self.height)
+
+        frame = self.reader.read()
+        if frame is not None:
+            self.writer.put(frame)
+
+    def record(self, duration=None, frames=None):
+        """Simulate and render `frames` frames (or `duration` simulated seconds)"""
+        if frames is None:
+            frames = round(duration * self.fps)
+        for _ in range(frames):
+            if not self.sim.running:
+                break
+            # Counted in steps from the start, so rounding never accumulates
+            self.frames += 1
+            target = self._start_step + round(self.frames / (self.fps * self.sim.dt))
+            while self.sim.step_count < target:
+                self.sim.step()
+                if self.plotter is not None:
+                    self.plotter.update_data(self.sim.elapsed_time, self.sim.drones)
+            self.render_frame()
+
+    def close(self):
+        try:
+            for frame in self.reader.drain():
+                self.writer.put(frame)
+        finally:
+            # GL resources go even if the writer failed; its error is raised after
+            self.reader.delete()
+            self.framebuffer.delete()
+            self.context.close()
+            self.writer.close()
+        print(f"Recorded {self.writer.frames} frames to {self.writer.path}")
+
+
+class CameraSensor(Sensor):
+    """Onboard RGB and depth cameras, rendered offscreen (EGL or OSMesa, e.g. Mesa llvmpipe)
+
+    Every camera drone's view is drawn with Rendering.render_scene into its own tile
+    of one atlas framebuffer, and the atlas comes back in a single glReadPixels per
+    channel, straight into buffers allocated once. `images` (rows, cols, h, w, 4)
+    uint8 RGBA and `depths` (rows, cols, h, w) float32 distance along the view axis in
+    metres (inf where nothing was drawn) are upright views into those buffers, as are image(k) / depth(k) for the
+    k-th camera; they are overwritten by the next update, so copy what you keep.
+
+    `drones` selects which drones carry a camera (all by default). The near plane
+    sits outside the drone's own body, so nothing closer than `near` is seen.
+    """
+
+    def __init__(self, width=64, height=48, rate_hz=None, fov=70.0, near=0.9, far=100.0, tilt=0.0,
+                 drones=None, color=True, depth=True, context=None):
+        super().__init__(rate_hz)
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.near = near
+        self.far = far
+        self.drones = drones
+        self.color = color
+        self.depth_enabled = depth
+        self.camera = OnboardCamera(tilt)
+        self.context = context
+        self._own_context = context is None
+        self.framebuffer = None
+
+    def reset(self, sim):
+        self.index = np.arange(len(sim.swarm)) if self.drones is None else np.asarray(self.drones)
+        count = len(self.index)
+        if self.framebuffer is not None:
+            self.close()
+        # Roughly square atlas of cols x rows tiles
+        self.cols = max(1, int(np.ceil(np.sqrt(count))))
+        self.rows = max(1, int(np.ceil(count / self.cols)))
+        atlas_w, atlas_h = self.cols * self.width, self.rows * self.height
+        if self.context is None:
+            self.context = OffscreenContext(atlas_w, atlas_h)
+        self.context.make_current()
+        self.framebuffer = Framebuffer(atlas_w, atlas_h)
+        self.renderer = Rendering()
+        self.renderer.init_gl_state()
+        # The own body is behind the near plane anyway; axes are a debugging aid
+        self.renderer.axes_distance = 0.0
+
+        self._color = np.zeros((atlas_h, atlas_w, 4), dtype=np.uint8)
+        self._depth = np.full((atlas_h, atlas_w), np.inf, dtype=np.float32)
+        self._background = np.empty((atlas_h, atlas_w), dtype=bool)
+        # GL rows run bottom-up; tiles are laid out so the flipped atlas reads top-down
+        self.images = self._color[::-1].reshape(self.rows, self.height, self.cols, self.width, 4).swapaxes(1, 2)
+        self.depths = self._depth[::-1].reshape(self.rows, self.height, self.cols, self.width).swapaxes(1, 2)
+
+    def image(self, k):
+        return self.images[k // self.cols, k % self.cols]
+
+    def depth(self, k):
+        return self.depths[k // self.cols, k % self.cols]
+
+    def measure(self, sim, dt):
+        self.context.make_current()
+        self.framebuffer.bind()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        swarm = sim.swarm
+        R = swarm.get_rotation_matrices(self.index)
+        for k, i in enumerate(self.index):
+            row, col = divmod(k, self.cols)
+            self.renderer.set_perspective(self.width, self.height, self.fov, self.near, self.far,
+                                          x=col * self.width, y=(self.rows - 1 - row) * self.height)
+            self.camera.set_pose(swarm.position[i], R[k])
+            self.renderer.render_scene(self.camera, sim.drones, clear=False, world=sim.world)
+
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        w, h = self.framebuffer.width, self.framebuffer.height
+        if self.color:
+            glReadPixelsRaw(0, 0, w, h, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(self._color.ctypes.data))
+        if self.depth_enabled:
+            depth = self._depth
+            glReadPixelsRaw(0, 0, w, h, GL_DEPTH_COMPONENT, GL_FLOAT, ctypes.c_void_p(depth.ctypes.data))
+            # Window depth in [0, 1] to eye distance, in place
+            n, f = self.near, self.far
+            np.greater_equal(depth, 1.0, out=self._background)
+            depth *= 2.0
+            depth -= 1.0
+            depth *= -(f - n)
+            depth += f + n
+            np.divide(2.0 * n * f, depth, out=depth)
+            np.copyto(depth, np.inf, where=self._background)
+        return self.images
+
+    def close(self):
+        if self.framebuffer is not None:
+            self.context.make_current()
+            self.framebuffer.delete()
+            self.framebuffer = None
+        if self._own_context and self.context is not None:
+            self.context.close()
+            self.context = None
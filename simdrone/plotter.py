@@ -12,6 +12,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
+from contextlib import contextmanager
 import matplotlib
 import numpy as np
 from PyQt6.QtWidgets import (
@@ -22,6 +24,8 @@ from PyQt6.QtCore import Qt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+from swarm import swarm_of
+
 
 def get_plot_config():
     """Shows a dialog to select the plotting layout and display mode using PyQt."""
@@ -74,9 +78,42 @@ def get_plot_config():
     
     return config
 
+class RingBuffer:
+    """Fixed-length history of several channels with O(1) appends
+
+    Every sample is written twice, at i and i + capacity, so the last `len` samples
+    are always one contiguous slice and view() never copies.
+    """
+
+    def __init__(self, channels, capacity):
+        self.capacity = capacity
+        self.data = np.zeros((channels, 2 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, values):
+        self.data[:, self.head] = values
+        self.data[:, self.head + self.capacity] = values
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def view(self):
+        """(channels, len) samples, oldest first"""
+        start = (self.head - self.count) % self.capacity
+        return self.data[:, start:start + self.count]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+
 class RealTimePlotter:
-    def __init__(self, num_drones, config):
+    def __init__(self, num_drones, config, history=300, blit=True):
         self.num_drones = num_drones
+        self.blit = blit
         self.layout = config['layout']
         self.mode = config['mode']
         
@@ -112,10 +149,16 @@ class RealTimePlotter:
         self.lines_pos = []
         self.lines_rot = []
         
-        # Buffers
-        self.times = []
-        self.pos_data = [[[], [], []] for _ in range(num_drones)]
-        self.rot_data = [[[], [], []] for _ in range(num_drones)]
+        # Buffers: channel 0 is time, then x/y/z position and rotation per drone
+        self.history = RingBuffer(1 + 6 * num_drones, history)
+        self._sample = np.empty(1 + 6 * num_drones)
+        self._drones = None
+        self._swarm = None
+
+        # Blitting: cached static background and the history rows drawn on each axes
+        self._background = None
+        self._background_size = None
+        self._axes_rows = []
         
         self._init_plot()
     
@@ -159,49 +202,176 @@ class RealTimePlotter:
             l5, = ax_rot.plot([], [], label=f'P', color=c, linestyle='--')
             l6, = ax_rot.plot([], [], label=f'Y', color=c, linestyle='-.')
             self.lines_rot.append([l4, l5, l6])
+
+        rows = {}
+        for i in range(self.num_drones):
+            for j in range(3):
+                rows.setdefault(ax_pos_list[i], []).append(1 + 6 * i + j)
+                rows.setdefault(ax_rot_list[i], []).append(4 + 6 * i + j)
+        self._axes_rows = [(ax, np.array(r)) for ax, r in rows.items()]
+        if self.blit:
+            # Animated lines are skipped by canvas.draw() and drawn with draw_artist
+            for line in self._all_lines():
+                line.set_animated(True)
         
         self.fig.tight_layout(pad=2.0)
+
+    def _all_lines(self):
+        return [line for lines in self.lines_pos + self.lines_rot for line in lines]
     
+    def clear(self):
+        """Drop the plotted history, e.g. after a replay seek"""
+        self.history.clear()
+
     def update_data(self, time_val, drones):
-        self.times.append(time_val)
-        if len(self.times) > 300:
-            self.times.pop(0)
-            for d in range(self.num_drones):
-                for a in range(3):
-                    self.pos_data[d][a].pop(0)
-                    self.rot_data[d][a].pop(0)
-        for i, drone in enumerate(drones):
-            pos = drone.state.position
-            rot = drone.state.rotation
-            for j in range(3):
-                self.pos_data[i][j].append(pos[j])
-                self.rot_data[i][j].append(rot[j])
+        if drones is not self._drones:
+            self._drones = drones
+            self._swarm = swarm_of(drones)
+        self._sample[0] = time_val
+        per_drone = self._sample[1:].reshape(self.num_drones, 2, 3)
+        if self._swarm is not None:
+            per_drone[:, 0] = self._swarm.position
+            per_drone[:, 1] = self._swarm.rotation
+        else:
+            for i, drone in enumerate(drones):
+                per_drone[i, 0] = drone.state.position
+                per_drone[i, 1] = drone.state.rotation
+        self.history.append(self._sample)
     
     def update_plot(self):
         """Called when in pop-out mode to refresh the window."""
-        self._update_lines()
-        self._relim()
+        view = self.history.view()
+        self._update_lines(view)
         if self.canvas:
-            self.canvas.draw()
+            self._draw(view)
             QApplication.processEvents()  # Qt 이벤트 루프 처리
         
-    def render_to_buffer(self):
-        """Called when in embedded mode to get image buffer."""
-        self._update_lines()
-        self._relim()
-        self.canvas.draw()  # Render with Agg
+    def render_to_buffer(self, view=None):
+        """Called when in embedded mode to get image buffer.
+
+        `view` is a (channels, n) history snapshot; defaults to the live ring buffer.
+        """
+        if view is None:
+            view = self.history.view()
+        self._update_lines(view)
+        self._draw(view)  # Render with Agg
         buf = np.asarray(self.canvas.buffer_rgba())  # Shape: (height, width, 4), RGBA
         width, height = self.canvas.get_width_height()
         return buf, width, height
+
+    def _draw(self, view):
+        if not self.blit:
+            self._relim()
+            self.canvas.draw()
+            return
+
+        # Full redraw only when the limits moved or the canvas was resized
+        size = self.canvas.get_width_height()
+        if self._rescale(view) or self._background is None or size != self._background_size:
+            self.canvas.draw()
+            self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+            self._background_size = size
+        else:
+            self.canvas.restore_region(self._background)
+        for ax, _ in self._axes_rows:
+            for line in ax.get_lines():
+                ax.draw_artist(line)
+        if self.mode != 'embedded':
+            self.canvas.blit(self.fig.bbox)
+
+    def _rescale(self, view, margin=0.25):
+        """Widen or shrink axis limits only when data leaves them (or fills under a quarter)"""
+        if view.shape[1] < 2:
+            return False
+        changed = False
+
+        # Time axis: jump ahead by half a window instead of sliding every frame
+        t0, t1 = view[0, 0], view[0, -1]
+        x0, x1 = self._axes_rows[0][0].get_xlim()
+        if t0 < x0 or t1 > x1:
+            for ax, _ in self._axes_rows:
+                ax.set_xlim(t0, t1 + 0.5 * (t1 - t0))
+            changed = True
+
+        for ax, rows in self._axes_rows:
+            data = view[rows]
+            lo, hi = data.min(), data.max()
+            y0, y1 = ax.get_ylim()
+            span = max(hi - lo, 0.1)
+            if lo < y0 or hi > y1 or span * (1 + 2 * margin) < 0.25 * (y1 - y0):
+                ax.set_ylim(lo - margin * span, hi + margin * span)
+                changed = True
+        return changed
     
-    def _update_lines(self):
+    def _update_lines(self, view):
+        # Row views straight out of the ring buffer, no list -> array conversion
+        times = view[0]
         for i in range(self.num_drones):
             for j in range(3):
-                self.lines_pos[i][j].set_data(self.times, self.pos_data[i][j])
-                self.lines_rot[i][j].set_data(self.times, self.rot_data[i][j])
+                self.lines_pos[i][j].set_data(times, view[1 + 6 * i + j])
+                self.lines_rot[i][j].set_data(times, view[4 + 6 * i + j])
     
     def _relim(self):
         axes_to_update = self.fig.axes if self.layout == 'combined' else [ax for row in self.axes for ax in row]
         for ax in axes_to_update:
             ax.relim()
-            ax.autoscale_view()
\ No newline at end of file
+            ax.autoscale_view()
+
+
+class PlotWorker:
+    """Rasterizes an embedded RealTimePlotter on a background thread
+
+    submit() hands over a copy of the history and returns at once; the worker renders
+    only the newest snapshot and publishes it into one of two RGBA frames.
+    """
+
+    def __init__(self, plotter):
+        self.plotter = plotter
+        self.version = 0
+        self._frames = [None, None]
+        self._front = 0
+        self._snapshot = None
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self):
+        snapshot = self.plotter.history.view().copy()
+        with self._cond:
+            # An older snapshot that was never picked up is simply replaced
+            self._snapshot = snapshot
+            self._cond.notify()
+
+    @contextmanager
+    def latest(self):
+        """Yield (rgba, version) of the newest finished frame, or None; the frame is
+        only guaranteed stable inside the with block"""
+        with self._cond:
+            frame = self._frames[self._front]
+            yield None if frame is None else (frame, self.version)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._snapshot is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                snapshot, self._snapshot = self._snapshot, None
+
+            buf, _, _ = self.plotter.render_to_buffer(snapshot)
+            # The back frame is never the one readers see, so it is filled without the lock
+            back = 1 - self._front
+            if self._frames[back] is None or self._frames[back].shape != buf.shape:
+                self._frames[back] = np.empty_like(buf)
+            np.copyto(self._frames[back], buf)
+            with self._cond:
+                self._front = back
+                self.version += 1
@@ -12,12 +12,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import ctypes
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
 
 from utils import *
+from swarm import SwarmState, swarm_of
+from meshes import MeshBuffer, InstancedRenderer, axes_vertices, cube_vertices, grid_vertices
 
 
 
@@ -29,43 +32,157 @@ class Rendering:
         self.plot_texture = None
         self.plot_width = 0
         self.plot_height = 0
+        self.plot_version = None
+        self.plot_pbos = None
+        self.plot_pbo_index = 0
+        # Static VBOs by (kind, size), and the instanced drone renderer once probed
+        self.meshes = {}
+        self.instanced = None
+        self.matrices = None
+        # Culling and level of detail: beyond lod_distance a drone is a point,
+        # axes are only drawn within axes_distance
+        self.culling = True
+        self.bounding_radius = 1.6
+        self.lod_distance = 150.0
+        self.axes_distance = 40.0
+        self.stats = {}
+
+    def init_gl_state(self):
+        """Fixed GL state the scene expects, for a fresh window or offscreen context"""
+        glClearColor(0.04, 0.04, 0.10, 1.0)
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_LIGHTING)
+        glEnable(GL_LIGHT0)
+        glEnable(GL_COLOR_MATERIAL)
+        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+
+    def set_perspective(self, width, height, fov=65, near=0.1, far=2000, x=0, y=0):
+        """Viewport at (x, y) and a projection with vertical field of view `fov` degrees"""
+        glViewport(int(x), int(y), int(width), int(height))
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        if height == 0: height = 1
+        gluPerspective(fov, width/height, near, far)
+        glMatrixMode(GL_MODELVIEW)
+
+    def _mesh(self, kind, size):
+        """Build a mesh VBO on first use (needs the GL context) and keep it"""
+        key = (kind, size)
+        if key not in self.meshes:
+            if kind == 'axes':
+                self.meshes[key] = MeshBuffer(*axes_vertices(size), GL_LINES)
+            elif kind == 'grid':
+                self.meshes[key] = MeshBuffer(*grid_vertices(*size), GL_LINES)
+            else:
+                self.meshes[key] = MeshBuffer(*cube_vertices(size), GL_QUADS)
+        return self.meshes[key]
 
     def draw_axes(self, length=1.5):
         glLineWidth(3.0)
-        glBegin(GL_LINES)
-        glColor3f(1.0, 0.0, 0.0); glVertex3f(0,0,0); glVertex3f(length,0,0)
-        glColor3f(0.0, 1.0, 0.0); glVertex3f(0,0,0); glVertex3f(0,length,0)
-        glColor3f(0.0, 0.0, 1.0); glVertex3f(0,0,0); glVertex3f(0,0,length)
-        glEnd()
+        self._mesh('axes', length).draw()
 
     def draw_grid(self, size=40, step=2):
         glLineWidth(1.0)
-        glColor3f(0.35, 0.35, 0.4)
-        glBegin(GL_LINES)
-        for i in range(-size, size + 1, step):
-            glVertex3f(i, -size, 0); glVertex3f(i, size, 0)
-            glVertex3f(-size, i, 0); glVertex3f(size, i, 0)
-        glEnd()
+        self._mesh('grid', (size, step)).draw()
 
     def draw_cube(self, size=1.2):
-        half = size / 2
-        glColor3f(0.85, 0.25, 0.25)
-        glBegin(GL_QUADS)
-        glVertex3f(-half,-half, half); glVertex3f( half,-half, half)
-        glVertex3f( half, half, half); glVertex3f(-half, half, half)
-        glVertex3f(-half,-half,-half); glVertex3f(-half, half,-half)
-        glVertex3f( half, half,-half); glVertex3f( half,-half,-half)
-        glVertex3f(-half,-half, half); glVertex3f(-half, half, half)
-        glVertex3f(-half, half,-half); glVertex3f(-half,-half,-half)
-        glVertex3f( half,-half, half); glVertex3f( half,-half,-half)
-        glVertex3f( half, half,-half); glVertex3f( half, half, half)
-        glVertex3f(-half, half, half); glVertex3f( half, half, half)
-        glVertex3f( half, half,-half); glVertex3f(-half, half,-half)
-        glVertex3f(-half,-half, half); glVertex3f(-half,-half,-half)
-        glVertex3f( half,-half,-half); glVertex3f( half,-half, half)
-        glEnd()
+        self._mesh('cube', size).draw()
+
+    def draw_world(self, world):
+        """Static obstacles of a world.World, as one VBO rebuilt only when the world changes"""
+        if not len(world):
+            return
+        key = ('world', id(world))
+        cached = self.meshes.get(key)
+        if cached is None or cached[0] != world.version:
+            if cached is not None:
+                cached[1].delete()
+            # Flat shading baked into the vertex colours, from the face normals
+            light = np.array([0.3, 0.5, -0.8])
+            light /= np.linalg.norm(light)
+            shade = 0.45 + 0.55 * np.abs(world.normals(slice(None)) @ light)
+            colors = np.repeat(world.colors * shade[:, None], 3, axis=0)
+            vertices = world.triangles.reshape(-1, 3)[:, [1, 0, 2]]
+            self.meshes[key] = (world.version, MeshBuffer(vertices, colors, GL_TRIANGLES))
+        glDisable(GL_LIGHTING)
+        self.meshes[key][1].draw()
+        glEnable(GL_LIGHTING)
+
+    def model_matrices(self, position, R):
+        """(N,16) float32 column-major model matrices in OpenGL axes from (N,3) positions
+        and (N,3,3) rotations
+
+        Built in one batch into a reused buffer. OpenGL X/Y are physics Y/X, so the
+        rotation is S @ R @ S.T with S swapping the first two axes.
+        """
+        n = len(position)
+        if self.matrices is None or len(self.matrices) < n:
+            self.matrices = np.zeros((max(n, 1), 4, 4), dtype=np.float32)
+            self.matrices[:, 3, 3] = 1.0
 
-    def render_scene(self, camera, drones, clear=True):
+        # Indexed [drone, column, row], i.e. each drone's matrix already column-major
+        m = self.matrices[:n]
+        swap = [1, 0, 2]
+        m[:, :3, :3] = R[:, swap][:, :, swap].transpose(0, 2, 1)
+        m[:, 3, :3] = position[:, swap]
+        return m.reshape(n, 16)
+
+    @staticmethod
+    def _swarm_of(drones):
+        swarm = swarm_of(drones)
+        if swarm is None:
+            # Loose drones: gather them into a scratch swarm
+            swarm = SwarmState(len(drones))
+            for i, drone in enumerate(drones):
+                swarm.position[i] = drone.state.position
+                swarm.rotation[i] = drone.state.rotation
+            swarm.set_rotation(swarm.rotation)
+        return swarm
+
+    def select_lod(self, camera, position):
+        """Split drones by what to draw, using the current GL modelview and projection
+
+        Returns (meshes, with_axes, points): indices drawn as full meshes, ordered so the
+        first `with_axes` of them also get axes, and indices drawn as single points.
+        Drones whose bounding sphere is outside the view frustum are in neither.
+        """
+        gl_position = position[:, [1, 0, 2]]
+        eye = camera.state.position[[1, 0, 2]]
+        distance = np.linalg.norm(gl_position - eye, axis=1)
+
+        if self.culling:
+            # Gribb/Hartmann: frustum planes are sums/differences of clip-matrix rows
+            view = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=float).T
+            projection = np.asarray(glGetFloatv(GL_PROJECTION_MATRIX), dtype=float).T
+            clip = projection @ view
+            planes = np.concatenate([clip[3] + clip[:3], clip[3] - clip[:3]])
+            planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+            signed = gl_position @ planes[:, :3].T + planes[:, 3]
+            visible = np.all(signed >= -self.bounding_radius, axis=1)
+        else:
+            visible = np.ones(len(position), dtype=bool)
+
+        near = visible & (distance < self.lod_distance)
+        axes = near & (distance < self.axes_distance)
+        meshes = np.concatenate([np.flatnonzero(axes), np.flatnonzero(near & ~axes)])
+        points = np.flatnonzero(visible & ~near)
+        return meshes, int(axes.sum()), points
+
+    def draw_points(self, position, size=3.0, color=(0.85, 0.25, 0.25)):
+        """Far-away drones as one GL_POINTS call from a client-side array"""
+        if not len(position):
+            return
+        points = np.ascontiguousarray(position[:, [1, 0, 2]], dtype=np.float32)
+        glDisable(GL_LIGHTING)
+        glPointSize(size)
+        glColor3f(*color)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, points)
+        glDrawArrays(GL_POINTS, 0, len(points))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glEnable(GL_LIGHTING)
+
+    def render_scene(self, camera, drones, clear=True, world=None):
         if clear:
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
@@ -76,35 +193,69 @@ class Rendering:
         self.draw_grid()
         glEnable(GL_DEPTH_TEST)
         glEnable(GL_LIGHTING)
+        if world is not None:
+            self.draw_world(world)
+
+        if self.instanced is None:
+            self.instanced = InstancedRenderer() if InstancedRenderer.supported() else False
+        swarm = self._swarm_of(drones)
+        meshes, with_axes, points = self.select_lod(camera, swarm.position)
+        self.stats = {'meshes': len(meshes), 'axes': with_axes, 'points': len(points),
+                      'culled': len(swarm) - len(meshes) - len(points)}
+        matrices = self.model_matrices(swarm.position[meshes], swarm.get_rotation_matrices(meshes))
         
-        # Render each drone
-        for drone in drones:
-            glPushMatrix()
-            glTranslatef(drone.state.position[1], drone.state.position[0], drone.state.position[2])
-            R = drone.state.get_rotation_matrix()
-            S = np.array([[0, 1, 0], [1, 0, 0], [0, 0, 1]])
-            R_open = S @ R @ S.T
-            mat4 = np.eye(4)
-            mat4[:3, :3] = R_open
-            r_mat = mat4.flatten('F').tolist()
-            glMultMatrixf(r_mat)
-            self.draw_cube(size=1.2)
-            self.draw_axes(length=1.6)
-            glPopMatrix()
-
-    def update_plot_texture(self, buffer, width, height):
+        if self.instanced:
+            # Visible swarm in two draw calls; drones that get axes come first in the buffer
+            self.instanced.upload(matrices)
+            self.instanced.draw(self._mesh('cube', 1.2))
+            glLineWidth(3.0)
+            self.instanced.draw(self._mesh('axes', 1.6), count=with_axes)
+        else:
+            for i, mat4 in enumerate(matrices):
+                glPushMatrix()
+                glMultMatrixf(mat4)
+                self.draw_cube(size=1.2)
+                if i < with_axes:
+                    self.draw_axes(length=1.6)
+                glPopMatrix()
+        self.draw_points(swarm.position[points])
+
+    def update_plot_texture(self, buffer, width, height, version=None):
+        # Same frame as last time: nothing to upload
+        if version is not None and version == self.plot_version:
+            return
+        self.plot_version = version
+
         if self.plot_texture is None:
             self.plot_texture = glGenTextures(1)
+            self.plot_pbos = glGenBuffers(2) if bool(glGenBuffers) else None
         
         glBindTexture(GL_TEXTURE_2D, self.plot_texture)
         glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-        # buffer is RGBA from matplotlib
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, buffer)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        
-        self.plot_width = width
-        self.plot_height = height
+        size = width * height * 4
+        if (width, height) != (self.plot_width, self.plot_height):
+            # Allocate storage once per size; later frames only replace the pixels
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            self.plot_width = width
+            self.plot_height = height
+
+        if self.plot_pbos is None:
+            # buffer is RGBA from matplotlib
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, buffer)
+            return
+
+        # Alternate between two PBOs so we never write into one the driver is still
+        # transferring from; orphaning with glBufferData avoids waiting on it either way
+        pbo = self.plot_pbos[self.plot_pbo_index]
+        self.plot_pbo_index = 1 - self.plot_pbo_index
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+        glBufferData(GL_PIXEL_UNPACK_BUFFER, size, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_PIXEL_UNPACK_BUFFER, 0, size, buffer)
+        # With a PBO bound the last argument is an offset into it, and the copy is asynchronous
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
 
     def draw_plot_overlay(self, x, y, width, height, window_width, window_height):
         if self.plot_texture is None:
@@ -128,11 +279,12 @@ class Rendering:
         x_start = x
         y_start = y
         
+        # Texture row 0 is the top of the matplotlib image
         glBegin(GL_QUADS)
-        glTexCoord2f(0, 1); glVertex2f(x_start, y_start)           # Top Left
-        glTexCoord2f(1, 1); glVertex2f(x_start + width, y_start) # Top Right
-        glTexCoord2f(1, 0); glVertex2f(x_start + width, y_start + height) # Bottom Right
-        glTexCoord2f(0, 0); glVertex2f(x_start, y_start + height)           # Bottom Left
+        glTexCoord2f(0, 0); glVertex2f(x_start, y_start)           # Top Left
+        glTexCoord2f(1, 0); glVertex2f(x_start + width, y_start) # Top Right
+        glTexCoord2f(1, 1); glVertex2f(x_start + width, y_start + height) # Bottom Right
+        glTexCoord2f(0, 1); glVertex2f(x_start, y_start + height)           # Bottom Left
         glEnd()
 
         glPopMatrix()
@@ -0,0 +1,89 @@
+# replay.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pygame
+from pygame.locals import *
+import numpy as np
+
+from logger import LogReader
+from simulator import Simulator
+
+
+
+
+class ReplayViewer(Simulator):
+    """Plays a recorded log through the simulator window instead of simulating
+
+    Enter: play/pause, Left/Right: seek -/+5 s, Up/Down: double/halve speed,
+    Comma/Period: step one frame back/forward (pauses playback).
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.reader = LogReader(path)
+        super().__init__(self.reader.num_drones)
+        self.speed = speed
+        self.playing = True
+        self.frame = 0
+        self.playback_time = self.reader.start_time
+        self._plotted_frame = None
+
+    def seek(self, t):
+        self.playback_time = float(np.clip(t, self.reader.start_time, self.reader.end_time))
+        self.frame = self.reader.index_at(self.playback_time)
+        # History on the plots no longer leads up to this frame
+        self.plotter.clear()
+        self.last_plot_update = float('-inf')
+
+    def step_frame(self, count=1):
+        self.playing = False
+        frame = int(np.clip(self.frame + count, 0, len(self.reader) - 1))
+        if frame < self.frame:
+            self.plotter.clear()
+            self.last_plot_update = float('-inf')
+        self.frame = frame
+        self.playback_time = self.reader.timestamp(frame)
+
+    def handle_key(self, key):
+        if key == K_RETURN:
+            self.playing = not self.playing
+        elif key == K_RIGHT:
+            self.seek(self.playback_time + 5.0)
+        elif key == K_LEFT:
+            self.seek(self.playback_time - 5.0)
+        elif key == K_UP:
+            self.speed *= 2.0
+        elif key == K_DOWN:
+            self.speed /= 2.0
+        elif key == K_PERIOD:
+            self.step_frame(1)
+        elif key == K_COMMA:
+            self.step_frame(-1)
+        elif key != K_p:
+            super().handle_key(key)
+
+    def update(self, frame_dt):
+        keys = pygame.key.get_pressed()
+        self.camera.update(keys, frame_dt)
+
+        if self.playing:
+            self.playback_time = min(self.playback_time + frame_dt * self.speed, self.reader.end_time)
+            self.frame = self.reader.index_at(self.playback_time)
+
+        self.reader.load(self.frame, self.swarm)
+        self.render_swarm.copy_from(self.swarm)
+        self.elapsed_time = self.reader.timestamp(self.frame)
+        if self.frame != self._plotted_frame:
+            self.snapshots.publish(self.swarm, self.elapsed_time)
+            self.update_plots()
+            self._plotted_frame = self.frame
@@ -0,0 +1,173 @@
+# sensors.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+
+from utils import *
+from world import World
+
+
+
+
+def lidar_beams(horizontal=360, elevations=(0.0,)):
+    """(B,3) body-frame unit vectors: `horizontal` beams around each elevation (degrees, + up)
+
+    Body axes are x forward, y right, z down, so beams at elevation e point up by e.
+    """
+    azimuth = np.linspace(0.0, 2 * np.pi, horizontal, endpoint=False)
+    elevation = np.deg2rad(np.asarray(elevations, dtype=float))
+    a, e = np.meshgrid(azimuth, elevation)
+    return np.column_stack([(np.cos(e) * np.cos(a)).ravel(), (np.cos(e) * np.sin(a)).ravel(), -np.sin(e).ravel()])
+
+
+class Sensor:
+    """Base class: a callable sim(t, dt) hook, registered with HeadlessSimulator.add_sensor
+
+    The simulator calls it after the physics step every 1/rate_hz simulated seconds.
+    Subclasses implement measure(sim, dt); the latest result is in `reading`, taken
+    at simulated time `time`, one row per drone.
+    """
+
+    def __init__(self, rate_hz=None, seed=None):
+        self.rate_hz = rate_hz
+        self.rng = np.random.default_rng(seed)
+        self.reading = None
+        self.time = None
+
+    def reset(self, sim):
+        """Called by add_sensor before the first reading"""
+        pass
+
+    def measure(self, sim, dt):
+        raise NotImplementedError
+
+    def __call__(self, sim, t, dt):
+        self.reading = self.measure(sim, dt)
+        self.time = t
+        return self.reading
+
+    def _noise(self, std, shape):
+        return self.rng.normal(0.0, std, shape) if std else np.zeros(shape)
+
+
+class IMU(Sensor):
+    """Accelerometer (specific force, m/s^2) and gyro (rad/s) in body axes, with noise and bias
+
+    `reading` is (N,6): accel in columns 0-2, gyro in 3-5 (also as `accel` / `gyro`).
+    Acceleration is the velocity change over the sensor period, so ground contact and
+    collisions show up like they would on a real IMU; a drone at rest reads -g on body z.
+    Biases start at N(0, *_bias) and random-walk by *_bias_walk per sqrt(second).
+    """
+
+    def __init__(self, rate_hz=None, accel_noise=0.05, accel_bias=0.05, accel_bias_walk=0.001,
+                 gyro_noise=0.005, gyro_bias=0.002, gyro_bias_walk=1e-4, seed=None):
+        super().__init__(rate_hz, seed)
+        self.accel_noise = accel_noise
+        self.accel_bias_std = accel_bias
+        self.accel_bias_walk = accel_bias_walk
+        self.gyro_noise = gyro_noise
+        self.gyro_bias_std = gyro_bias
+        self.gyro_bias_walk = gyro_bias_walk
+
+    def reset(self, sim):
+        n = len(sim.swarm)
+        self.accel_bias = self._noise(self.accel_bias_std, (n, 3))
+        self.gyro_bias = self._noise(self.gyro_bias_std, (n, 3))
+        self._velocity = sim.swarm.velocity.copy()
+
+    @property
+    def accel(self):
+        return self.reading[:, 0:3]
+
+    @property
+    def gyro(self):
+        return self.reading[:, 3:6]
+
+    def measure(self, sim, dt):
+        swarm = sim.swarm
+        n = len(swarm)
+        accel = (swarm.velocity - self._velocity) / dt
+        self._velocity[:] = swarm.velocity
+        # Specific force: what the proof mass feels, i.e. acceleration minus gravity (NED)
+        accel[:, 2] -= GRAVITY
+        R = swarm.get_rotation_matrices()
+
+        self.accel_bias += self._noise(self.accel_bias_walk * np.sqrt(dt), (n, 3))
+        self.gyro_bias += self._noise(self.gyro_bias_walk * np.sqrt(dt), (n, 3))
+        reading = np.empty((n, 6))
+        # World -> body is R transposed
+        reading[:, 0:3] = np.einsum('nji,nj->ni', R, accel) + self.accel_bias + self._noise(self.accel_noise, (n, 3))
+        reading[:, 3:6] = swarm.angular_velocity + self.gyro_bias + self._noise(self.gyro_noise, (n, 3))
+        return reading
+
+
+class Altimeter(Sensor):
+    """Barometric altitude above z = 0 (m, + up), (N,) with noise, a fixed bias and quantisation"""
+
+    def __init__(self, rate_hz=None, noise=0.1, bias=0.0, resolution=0.0, seed=None):
+        super().__init__(rate_hz, seed)
+        self.noise = noise
+        self.bias = bias
+        self.resolution = resolution
+
+    def measure(self, sim, dt):
+        altitude = -sim.swarm.position[:, 2] + self.bias + self._noise(self.noise, len(sim.swarm))
+        if self.resolution:
+            altitude = np.round(altitude / self.resolution) * self.resolution
+        return altitude
+
+
+class Rangefinder(Sensor):
+    """Multi-beam range sensor: one rangefinder or a whole lidar per drone
+
+    `beams` are body-frame directions (B,3); the default is a single beam straight
+    down, i.e. height above whatever is below. Every beam of every drone is cast in
+    one World.raycast batch against sim.world (if any) and the ground. `reading` is
+    (N,B) ranges in metres, inf where nothing is within [min_range, max_range], with
+    Gaussian noise of `noise` + `noise_ratio` * range.
+    """
+
+    def __init__(self, beams=((0.0, 0.0, 1.0),), rate_hz=None, max_range=40.0, min_range=0.05,
+                 noise=0.01, noise_ratio=0.0, ground=True, seed=None):
+        super().__init__(rate_hz, seed)
+        beams = np.atleast_2d(np.asarray(beams, dtype=float))
+        self.beams = beams / np.linalg.norm(beams, axis=1)[:, None]
+        self.max_range = max_range
+        self.min_range = min_range
+        self.noise = noise
+        self.noise_ratio = noise_ratio
+        self.ground = ground
+        # Ground-only raycasts when the simulator has no world
+        self._empty_world = World()
+
+    @classmethod
+    def lidar(cls, horizontal=360, elevations=(0.0,), **kwargs):
+        return cls(lidar_beams(horizontal, elevations), **kwargs)
+
+    def directions(self, sim):
+        """(N,B,3) world-frame beam directions"""
+        return np.einsum('nij,bj->nbi', sim.swarm.get_rotation_matrices(), self.beams)
+
+    def measure(self, sim, dt):
+        world = sim.world if sim.world is not None else self._empty_world
+        n, b = len(sim.swarm), len(self.beams)
+        origins = np.repeat(sim.swarm.position, b, axis=0)
+        distance, _ = world.raycast(origins, self.directions(sim).reshape(-1, 3), self.max_range, self.ground)
+        distance = distance.reshape(n, b)
+
+        hit = np.isfinite(distance)
+        std = self.noise + self.noise_ratio * distance[hit]
+        distance[hit] = np.maximum(distance[hit] + self.rng.normal(0.0, 1.0, hit.sum()) * std, 0.0)
+        distance[distance < self.min_range] = np.inf
+        return distance
@@ -30,16 +30,31 @@ from drone import Drone
 from render import Rendering
 from drone import Drone
 from camera import Camera
-from logger import Logger
-from plotter import RealTimePlotter, get_plot_config
+from swarm import SwarmState
+from headless import HeadlessSimulator
+from plotter import RealTimePlotter, PlotWorker, get_plot_config
 from settings import SettingsDialog
 
 
 
 
-class Simulator:
+class Simulator(HeadlessSimulator):
+
+    def __init__(self, num_drones=1, physics_rate=500.0, max_frame_time=0.25, plot_history=300, parameters=None,
+                 integrator=None, logger=None):
+        # Physics runs at a fixed rate, independent of the 60 Hz display
+        # `logger`: e.g. Logger(stream=True) so a long session goes to disk as it runs
+        super().__init__(num_drones, dt=1.0 / physics_rate, logger=logger, parameters=parameters,
+                         integrator=integrator)
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+
+        # States either side of the render time, and the blend that gets drawn
+        self.previous_swarm = SwarmState(num_drones)
+        self.previous_swarm.copy_from(self.swarm)
+        self.render_swarm = SwarmState(num_drones)
+        self.render_drones = [Drone(self.render_swarm, i) for i in range(num_drones)]
 
-    def __init__(self, num_drones=1):
         # Ask for layout first
         self.plot_config = get_plot_config()
         
@@ -50,17 +65,15 @@ class Simulator:
             self.display = (1000, 700)
             
         self.camera = Camera()
-        self.drones = [Drone() for _ in range(num_drones)]
         self.renderer = Rendering()
         self.clock = pygame.time.Clock()
-        self.running = True
-        self.logger = Logger()
-        self.elapsed_time = 0.0
         
         # Plotter
-        self.plotter = RealTimePlotter(num_drones, config=self.plot_config)
+        self.plotter = RealTimePlotter(num_drones, config=self.plot_config, history=plot_history)
         self.plot_update_interval = 0.1 # 10Hz
         self.last_plot_update = 0.0
+        # Embedded plots are rasterized off the render thread
+        self.plot_worker = PlotWorker(self.plotter) if self.plot_config['mode'] == 'embedded' else None
 
         self.trajectory_queue = None
 
@@ -70,74 +83,77 @@ class Simulator:
         pygame.display.set_caption("Drone Simulator")
         pygame.mouse.set_visible(True)
         pygame.event.set_grab(False)
-        glClearColor(0.04, 0.04, 0.10, 1.0)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_COLOR_MATERIAL)
-        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+        self.renderer.init_gl_state()
         self.set_perspective(self.display[0], self.display[1])
 
     def set_perspective(self, width, height):
-        glViewport(0, 0, int(width), int(height))
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        if height == 0: height = 1
-        gluPerspective(65, width/height, 0.1, 2000)
-        glMatrixMode(GL_MODELVIEW)
+        self.renderer.set_perspective(width, height)
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
                 self.running = False
             if event.type == KEYDOWN:
-                if event.key == K_p:
-                    for drone in self.drones:
-                        drone.reset()
-                if event.key == K_o:  # 'S' 키로 설정 열기
-                    dialog = SettingsDialog(self.config)
-                    if dialog.exec() == QDialog.DialogCode.Accepted:
-                        self.save_config()
-                        # 적용: display 재설정 등 (필요시 restart)
-                        self.display = (self.config['display']['width'], self.config['display']['height'])
-                        self.set_perspective()
-                        self.camera.top_height = self.config['camera']['top_height']
+                self.handle_key(event.key)
             if event.type == VIDEORESIZE:
                 self.display = event.size
                 pygame.display.set_mode(self.display, DOUBLEBUF | OPENGL | RESIZABLE)
                 # self.set_perspective() # Handled in loop
 
-    def update(self, dt):
+    def handle_key(self, key):
+        if key == K_p:
+            for drone in self.drones:
+                drone.reset()
+            self.previous_swarm.copy_from(self.swarm)
+            self.snapshots.publish(self.swarm, self.elapsed_time)
+        if key == K_o:  # 'S' 키로 설정 열기
+            dialog = SettingsDialog(self.config)
+            if dialog.exec() == QDialog.DialogCode.Accepted:
+                self.save_config()
+                # 적용: display 재설정 등 (필요시 restart)
+                self.display = (self.config['display']['width'], self.config['display']['height'])
+                self.set_perspective()
+                self.camera.top_height = self.config['camera']['top_height']
+
+    def update(self, frame_dt):
         keys = pygame.key.get_pressed()
-        self.camera.update(keys, dt)
+        self.camera.update(keys, frame_dt)
 
-        # print(self.drone.state.get_status())
-        # self.trajectory.append(self.drone.state.get_status())
         # Drone controls are set via functions externally
-        for drone in self.drones:
-            drone.update_dynamics(dt)
-        
-        self.elapsed_time += dt
-        self.logger.log(self.elapsed_time, self.drones)
-
+        # Clamp long frames (dialogs, GC pauses) so physics never has to catch up a huge backlog
+        self.accumulator += min(frame_dt, self.max_frame_time)
+        while self.accumulator >= self.dt:
+            self.previous_swarm.copy_from(self.swarm)
+            self.step()
+            self.accumulator -= self.dt
+        self.render_swarm.interpolate(self.previous_swarm, self.swarm, self.accumulator / self.dt)
+        self.update_plots()
+
+    def update_plots(self):
         # Update Plotter Data
         self.plotter.update_data(self.elapsed_time, self.drones)
         
         # Render Plot 
         if self.elapsed_time - self.last_plot_update > self.plot_update_interval:
             if self.plot_config['mode'] == 'embedded':
-                buf, w, h = self.plotter.render_to_buffer()
-                self.renderer.update_plot_texture(buf, w, h)
+                self.plot_worker.submit()
             else:
                 self.plotter.update_plot()
             self.last_plot_update = self.elapsed_time
 
-    def run(self, result_queue=None):
+    def upload_plot(self):
+        """Hand the newest finished plot frame to the renderer, which skips repeats"""
+        with self.plot_worker.latest() as frame:
+            if frame is not None:
+                buf, version = frame
+                self.renderer.update_plot_texture(buf, buf.shape[1], buf.shape[0], version)
+
+    def run(self, result_queue=None, as_rows=False):
         self.init_opengl()
         while self.running:
-            dt = self.clock.tick(60) / 1000.0
+            frame_dt = self.clock.tick(60) / 1000.0
             self.handle_events()
-            self.update(dt)
+            self.update(frame_dt)
             
             # Clear Full Window
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -152,9 +168,10 @@ class Simulator:
                 # 1. Render Simulation (Left)
                 glViewport(0, 0, sim_w, sim_h)
                 self.set_perspective(sim_w, sim_h)
-                self.renderer.render_scene(self.camera, self.drones, clear=False) 
+                self.renderer.render_scene(self.camera, self.render_drones, clear=False, world=self.world) 
                 
                 # 2. Render Plot Overlay (Right)
+                self.upload_plot()
                 glViewport(0, 0, self.display[0], self.display[1])
                 # Draw rect at (x, y, w, h)
                 self.renderer.draw_plot_overlay(sim_w, 0, plot_w, sim_h, self.display[0], self.display[1])
@@ -162,14 +179,17 @@ class Simulator:
                 # Pop-out mode: Full screen simulation
                 glViewport(0, 0, self.display[0], self.display[1])
                 self.set_perspective(self.display[0], self.display[1])
-                self.renderer.render_scene(self.camera, self.drones, clear=False)
+                self.renderer.render_scene(self.camera, self.render_drones, clear=False, world=self.world)
             
             pygame.display.flip()
 
         pygame.quit()
+        if self.plot_worker is not None:
+            self.plot_worker.close()
         self.logger.save()
 
         # trajectory = self.trajectory[:]  # copy for safety
+        data = self.logger.contents(as_rows)
         if result_queue:
-            result_queue.put(self.logger.data)  # Queue
-        return self.logger.data
\ No newline at end of file
+            result_queue.put(data)  # Queue
+        return data
\ No newline at end of file
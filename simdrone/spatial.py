@@ -0,0 +1,172 @@
+# spatial.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+
+
+
+
+# Cell coordinates are packed into one int64 key, 20 bits per axis, so a neighbouring
+# cell's key is the key plus a constant offset
+_BITS = 20
+_BIAS = 1 << (_BITS - 1)
+
+
+def _pack(cells):
+    cells = cells + _BIAS
+    return (cells[:, 0] << (2 * _BITS)) | (cells[:, 1] << _BITS) | cells[:, 2]
+
+
+def expand_ranges(starts, counts):
+    """Concatenation of arange(s, s + c) for each start/count pair"""
+    total = counts.sum()
+    # Position within each run, plus that run's start
+    run_ends = np.cumsum(counts)
+    offsets = np.arange(total) - np.repeat(run_ends - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+class SpatialHash:
+    """Uniform-grid broad phase over N points: all pairs within r in about O(N)
+
+    update() buckets the points by cell (one vectorized floor and sort; the previous
+    order is reused, so a swarm that barely moved re-sorts almost for free). pairs()
+    then only compares points in neighbouring cells. Cells span +-2**19 cell sizes
+    per axis around the origin.
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.positions = np.empty((0, 3))
+        self.order = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.sorted_keys = np.empty(0, dtype=np.int64)
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_starts = np.empty(0, dtype=np.int64)
+        self.cell_counts = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def update(self, positions):
+        """Re-bucket (N,3) `positions` (kept by reference, not copied)"""
+        self.positions = positions
+        keys = _pack(np.floor(positions / self.cell_size).astype(np.int64))
+        if len(self.order) != len(keys):
+            self.order = np.arange(len(keys))
+        # Stable sort of keys already in last step's order: nearly sorted, so cheap
+        perm = np.argsort(keys[self.order], kind='stable')
+        self.order = self.order[perm]
+        self.sorted_keys = keys[self.order]
+        self.keys = keys
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            self.sorted_keys, return_index=True, return_counts=True)
+
+    def _neighbour_offsets(self, radius, half=False):
+        """Key offsets of the cells within reach; with `half`, only the zero offset and
+        those lexicographically after it, so each pair of cells is visited once"""
+        reach = int(np.ceil(radius / self.cell_size))
+        steps = np.arange(-reach, reach + 1)
+        grid = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        offsets = (grid[:, 0] << (2 * _BITS)) + (grid[:, 1] << _BITS) + grid[:, 2]
+        return offsets[offsets >= 0] if half else offsets
+
+    def _candidates(self, keys, radius, half=False):
+        """(query, point) index arrays for every point in the cells around each key"""
+        queries, points = [], []
+        for offset in self._neighbour_offsets(radius, half):
+            target = keys + offset
+            slot = np.searchsorted(self.cell_keys, target)
+            slot = np.minimum(slot, len(self.cell_keys) - 1)
+            hit = np.flatnonzero(self.cell_keys[slot] == target)
+            if not len(hit):
+                continue
+            counts = self.cell_counts[slot[hit]]
+            queries.append(np.repeat(hit, counts))
+            points.append(self.order[expand_ranges(self.cell_starts[slot[hit]], counts)])
+        if not queries:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(queries), np.concatenate(points)
+
+    def pairs(self, radius):
+        """(M,2) index pairs i < j with |p_i - p_j| <= radius, and their (M,) distances"""
+        if not len(self.cell_keys):
+            return np.empty((0, 2), dtype=np.int64), np.empty(0)
+        i, j = self._candidates(self.keys, radius, half=True)
+        # Points sharing a cell meet twice; other cell pairs once, in either index order
+        same = self.keys[i] == self.keys[j]
+        keep = ~same | (i < j)
+        i, j = i[keep], j[keep]
+        distance = np.linalg.norm(self.positions[j] - self.positions[i], axis=1)
+        close = distance <= radius
+        i, j = i[close], j[close]
+        return np.column_stack([np.minimum(i, j), np.maximum(i, j)]), distance[close]
+
+    def query(self, points, radius):
+        """Neighbours of arbitrary (K,3) `points`: (query index, point index) arrays"""
+        points = np.atleast_2d(points)
+        if not len(self.cell_keys):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        keys = _pack(np.floor(points / self.cell_size).astype(np.int64))
+        q, j = self._candidates(keys, radius)
+        close = np.linalg.norm(self.positions[j] - points[q], axis=1) <= radius
+        return q[close], j[close]
+
+
+class DroneCollisions:
+    """Drone-drone contacts for a SwarmState: spheres of `radius`, pushed apart after each step
+
+    Overlapping pairs are separated along the line between their centres and lose the
+    approaching part of their relative velocity (scaled by 1 + `restitution`), split
+    by mass. Assign one to HeadlessSimulator.collisions; the contacts of the last step
+    are in `pairs`.
+    """
+
+    def __init__(self, radius=0.5, restitution=0.2):
+        self.radius = radius
+        self.restitution = restitution
+        self.hash = SpatialHash(cell_size=2 * radius)
+        self.pairs = np.empty((0, 2), dtype=np.int64)
+
+    def update(self, swarm):
+        self.hash.update(swarm.position)
+        pairs, distance = self.hash.pairs(2 * self.radius)
+        self.pairs = pairs
+        if not len(pairs):
+            return pairs
+
+        i, j = pairs.T
+        delta = swarm.position[j] - swarm.position[i]
+        # Coincident centres: separate along an arbitrary axis
+        distance = np.where(distance > 1e-9, distance, 1e-9)
+        normal = delta / distance[:, None]
+        normal[distance <= 1e-9] = [0.0, 0.0, 1.0]
+
+        inverse_mass = 1.0 / swarm.mass
+        share_i = inverse_mass[i] / (inverse_mass[i] + inverse_mass[j])
+        share_j = 1.0 - share_i
+
+        # Positional correction, split by inverse mass
+        depth = (2 * self.radius - distance)[:, None] * normal
+        np.add.at(swarm.position, i, -depth * share_i[:, None])
+        np.add.at(swarm.position, j, depth * share_j[:, None])
+
+        # Velocity impulse on approaching pairs only
+        closing = np.einsum('ij,ij->i', swarm.velocity[j] - swarm.velocity[i], normal)
+        closing = np.minimum(closing, 0.0)[:, None] * normal * (1 + self.restitution)
+        np.add.at(swarm.velocity, i, closing * share_i[:, None])
+        np.add.at(swarm.velocity, j, -closing * share_j[:, None])
+        return pairs
@@ -0,0 +1,372 @@
+# swarm.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import dataclasses
+import numpy as np
+
+from utils import *
+from integrators import make_integrator
+
+
+
+
+def quaternions_from_euler(rotation):
+    """(..., 3) pitch, yaw, roll degrees -> (..., 4) w, x, y, z with the same R as
+    TransformState.get_rotation_matrix"""
+    half = np.deg2rad(rotation) / 2
+    cp, sp = np.cos(half[..., 0]), np.sin(half[..., 0])
+    cy, sy = np.cos(half[..., 1]), np.sin(half[..., 1])
+    cr, sr = np.cos(half[..., 2]), np.sin(half[..., 2])
+    return np.stack([
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    ], axis=-1)
+
+
+def euler_from_quaternions(q, out=None):
+    """(N,4) unit quaternions -> (N,3) pitch, yaw, roll degrees (pitch in [-90, 90])"""
+    w, x, y, z = q.T
+    out = np.empty((len(q), 3)) if out is None else out
+    out[:, 0] = np.arcsin(np.clip(2 * (w * y - x * z), -1.0, 1.0))
+    out[:, 1] = np.arctan2(2 * (x * y + w * z), 1 - 2 * (y * y + z * z))
+    out[:, 2] = np.arctan2(2 * (y * z + w * x), 1 - 2 * (x * x + y * y))
+    return np.degrees(out, out=out)
+
+
+def quaternion_matrices(q):
+    """(N,4) unit quaternions -> (N,3,3) body -> world rotation matrices"""
+    w, x, y, z = q.T
+    R = np.empty((len(q), 3, 3))
+    R[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    R[:, 0, 1] = 2 * (x * y - w * z)
+    R[:, 0, 2] = 2 * (x * z + w * y)
+    R[:, 1, 0] = 2 * (x * y + w * z)
+    R[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    R[:, 1, 2] = 2 * (y * z - w * x)
+    R[:, 2, 0] = 2 * (x * z - w * y)
+    R[:, 2, 1] = 2 * (y * z + w * x)
+    R[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+
+def quaternion_multiply(a, b, out=None):
+    """Hamilton product a * b of (N,4) quaternions"""
+    aw, ax, ay, az = a.T
+    bw, bx, by, bz = b.T
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape)) if out is None else out
+    out[:, 0] = aw * bw - ax * bx - ay * by - az * bz
+    out[:, 1] = aw * bx + ax * bw + ay * bz - az * by
+    out[:, 2] = aw * by - ax * bz + ay * bw + az * bx
+    out[:, 3] = aw * bz + ax * by - ay * bx + az * bw
+    return out
+
+
+def rotation_quaternions(rotvec):
+    """Exponential map: (N,3) rotation vectors (axis * angle, rad) -> (N,4) unit quaternions"""
+    angle = np.linalg.norm(rotvec, axis=1)
+    q = np.empty((len(rotvec), 4))
+    q[:, 0] = np.cos(angle / 2)
+    # sin(angle/2) / angle, written with sinc so it stays finite at zero rotation
+    q[:, 1:] = rotvec * (0.5 * np.sinc(angle / (2 * np.pi)))[:, None]
+    return q
+
+
+def swarm_of(drones):
+    """The SwarmState whose rows 0..N-1 are exactly `drones`, or None"""
+    swarm = getattr(drones[0], 'swarm', None) if drones else None
+    if swarm is None or len(swarm) != len(drones):
+        return None
+    if all(d.swarm is swarm and d.index == i for i, d in enumerate(drones)):
+        return swarm
+    return None
+
+
+class SwarmState:
+    """Structure-of-arrays state for N drones, stepped as one batch
+
+    position, velocity, quaternion and angular_velocity are column views into one
+    packed (N,13) `state` array, which is what the integrators advance. Attitude lives
+    in `quaternion`; `rotation` (Euler degrees) is derived from it after every change,
+    for rendering, logging and plots. Assign attitudes through set_rotation() rather
+    than writing into `rotation`.
+    """
+
+    STATE_FIELDS = ('position', 'velocity', 'quaternion', 'angular_velocity')
+
+    # DroneParameters field -> (array attribute, column or None)
+    PARAMETERS = {
+        'mass': ('mass', None),
+        'Ixx': ('inertia', 0),
+        'Iyy': ('inertia', 1),
+        'Izz': ('inertia', 2),
+        'max_thrust': ('max_thrust', None),
+        'max_torque': ('max_torque', None),
+        'drag_linear': ('drag_linear', None),
+    }
+
+    # Columns of each field in the packed state
+    LAYOUT = {
+        'position': slice(0, 3),
+        'velocity': slice(3, 6),
+        'quaternion': slice(6, 10),
+        'angular_velocity': slice(10, 13),
+    }
+
+    def __init__(self, num_drones=1, position=[0.0, 0.0, -0.5], parameters=None, integrator=None):
+        self.num_drones = num_drones
+        self.state = np.zeros((num_drones, 13))
+        self.position = self.state[:, self.LAYOUT['position']]
+        self.velocity = self.state[:, self.LAYOUT['velocity']]
+        # Attitude, body -> world: w, x, y, z
+        self.quaternion = self.state[:, self.LAYOUT['quaternion']]
+        # Angular velocity in rad/s about body x, y, z: p, q, r
+        self.angular_velocity = self.state[:, self.LAYOUT['angular_velocity']]
+        self.position[:] = position
+        self.quaternion[:, 0] = 1.0
+        # Euler angles in degrees: pitch, yaw, roll (derived from quaternion)
+        self.rotation = np.zeros((num_drones, 3))
+        # Normalized controls, set through Drone.set_control
+        self.thrust = np.zeros(num_drones)
+        self.torques = np.zeros((num_drones, 3))
+        # Physical parameters, one row per drone
+        self.mass = np.empty(num_drones)
+        self.inertia = np.empty((num_drones, 3))
+        self.max_thrust = np.empty(num_drones)
+        self.max_torque = np.empty(num_drones)
+        self.drag_linear = np.empty(num_drones)
+        self.set_parameters(parameters if parameters is not None else DroneParameters())
+        # integrators.SemiImplicitEuler, RK4 or RK45 (or their names)
+        self.integrator = make_integrator(integrator)
+
+    def __len__(self):
+        return self.num_drones
+
+    def copy_from(self, other):
+        """Copy the kinematic state of a swarm of the same size"""
+        np.copyto(self.state, other.state)
+        np.copyto(self.rotation, other.rotation)
+
+    def interpolate(self, previous, current, alpha):
+        """Write previous + (current - previous) * alpha into this swarm (nlerp for attitude)"""
+        for name in self.STATE_FIELDS:
+            out = getattr(self, name)
+            start = getattr(previous, name)
+            end = getattr(current, name)
+            if name == 'quaternion':
+                # q and -q are the same attitude: blend towards the nearer one
+                flip = np.einsum('ij,ij->i', start, end) < 0
+                end = np.where(flip[:, None], -end, end)
+            np.subtract(end, start, out=out)
+            out *= alpha
+            out += start
+        self.normalize()
+
+    def normalize(self, index=slice(None)):
+        """Renormalise the quaternions and refresh the Euler angles from them"""
+        quaternion = self.quaternion[index]
+        quaternion /= np.linalg.norm(quaternion, axis=1)[:, None]
+        euler_from_quaternions(quaternion, out=self.rotation[index])
+
+    def set_rotation(self, rotation, index=slice(None)):
+        """Set attitudes from pitch, yaw, roll degrees"""
+        self.rotation[index] = rotation
+        self.quaternion[index] = quaternions_from_euler(self.rotation[index])
+
+    def set_parameters(self, parameters=None, index=slice(None), **values):
+        """Set the physical parameters of the drones selected by `index`
+
+        `parameters` is one DroneParameters for all of them or a sequence with one per
+        drone; keyword values (DroneParameters field names, scalars or arrays) override it.
+        """
+        if isinstance(parameters, DroneParameters):
+            values = {**dataclasses.asdict(parameters), **values}
+        elif parameters is not None:
+            rows = [dataclasses.asdict(p) for p in parameters]
+            values = {**{name: [row[name] for row in rows] for name in rows[0]}, **values}
+        for name, value in values.items():
+            attribute, column = self.PARAMETERS[name]
+            array = getattr(self, attribute)
+            if column is None:
+                array[index] = value
+            else:
+                array[index, column] = value
+
+    def get_parameters(self, i):
+        return DroneParameters(**{
+            name: float(getattr(self, attribute)[i] if column is None else getattr(self, attribute)[i, column])
+            for name, (attribute, column) in self.PARAMETERS.items()
+        })
+
+    def get_rotation_matrices(self, index=slice(None)):
+        return quaternion_matrices(self.quaternion[index])
+
+    def get_status(self):
+        # Same keys as TransformState.get_status, one row per drone
+        return {
+            'position': self.position,
+            'velociaty': self.velocity,
+            'rotation': self.rotation
+        }
+
+    def accelerations(self, state, index=slice(None)):
+        """Linear and angular accelerations of packed `state` rows for drones `index`
+
+        Controls and parameters are the drones' current ones; `state` may be a trial
+        state of an integrator stage rather than the swarm's own.
+        """
+        velocity = state[:, 3:6]
+        angular_velocity = state[:, 10:13]
+        mass = self.mass[index]
+        inertia = self.inertia[index]
+
+        # Thrust acts along body -Z, so only the third column of R is needed
+        R = quaternion_matrices(state[:, 6:10])
+        thrust = -self.thrust[index] * self.max_thrust[index]
+        accel = R[:, :, 2] * (thrust / mass)[:, None]
+        accel -= velocity * (self.drag_linear[index] / mass)[:, None]
+        accel[:, 2] += GRAVITY  # +Z down
+
+        # Euler's equations in body axes: I dw/dt = torque - w x Iw
+        torque = self.torques[index] * self.max_torque[index][:, None]
+        ang_accel = (torque - np.cross(angular_velocity, inertia * angular_velocity)) / inertia
+        return accel, ang_accel
+
+    def derivatives(self, state, index=slice(None), out=None):
+        """d(state)/dt of packed (N,13) `state` rows, into `out`"""
+        out = np.empty_like(state) if out is None else out
+        accel, ang_accel = self.accelerations(state, index)
+        out[:, 0:3] = state[:, 3:6]
+        out[:, 3:6] = accel
+        # dq/dt = q * (0, w) / 2 for body rates w
+        pure = np.zeros((len(state), 4))
+        pure[:, 1:] = state[:, 10:13]
+        quaternion_multiply(state[:, 6:10], pure, out=out[:, 6:10])
+        out[:, 6:10] *= 0.5
+        out[:, 10:13] = ang_accel
+        return out
+
+    def rotate(self, rotvec, index=slice(None)):
+        """Turn the drones `index` by body-frame rotation vectors (axis * angle, rad)"""
+        quaternion = self.quaternion[index]
+        quaternion_multiply(quaternion.copy(), rotation_quaternions(rotvec), out=quaternion)
+
+    def constrain(self, index=slice(None)):
+        """Ground contact and quaternion renormalisation, after every integrator step"""
+        position = self.position[index]
+        velocity = self.velocity[index]
+
+        # Ground collision (NED: +Z is down, ground at Z=0)
+        grounded = position[:, 2] > -0.6
+        position[grounded, 2] = -0.6
+        velocity[grounded & (velocity[:, 2] > 0), 2] = 0
+
+        self.normalize(index)
+
+    def step(self, dt, index=slice(None)):
+        """Advance the drones selected by `index` (a slice, so every array below is a view)"""
+        self.integrator.step(self, dt, index)
+
+
+def _row(name):
+    def get(self):
+        return getattr(self.swarm, name)[self.index]
+
+    def set(self, value):
+        getattr(self.swarm, name)[self.index] = value
+
+    return property(get, set)
+
+
+def _rotation_row():
+    def get(self):
+        return self.swarm.rotation[self.index]
+
+    def set(self, value):
+        self.swarm.set_rotation(value, self.index)
+
+    return property(get, set)
+
+
+class SwarmTransformState(TransformState):
+    """TransformState whose arrays are row views into a SwarmState"""
+
+    position = _row('position')
+    velocity = _row('velocity')
+    rotation = _rotation_row()
+    angular_velocity = _row('angular_velocity')
+
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+
+
+class SwarmSnapshots:
+    """Double-buffered, sequence-numbered copies of a swarm's state for other threads
+
+    publish() (simulation thread only) fills the back buffer with one (N,12) block of
+    position, velocity, rotation and angular_velocity (COLUMNS), then bumps `sequence`
+    to make it the front buffer. Readers never take a lock: latest() hands out the
+    front buffer as a read-only view, and read() copies it and retries if the writer
+    came round to that buffer again during the copy (a seqlock over two buffers).
+    """
+
+    COLUMNS = {name: slice(3 * k, 3 * k + 3)
+               for k, name in enumerate(('position', 'velocity', 'rotation', 'angular_velocity'))}
+
+    def __init__(self, num_drones):
+        self._buffers = [np.zeros((num_drones, 12)), np.zeros((num_drones, 12))]
+        self._views = []
+        for buffer in self._buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self._times = [0.0, 0.0]
+        # Snapshot being written (sequence + 1 while publishing) and last published
+        self._writing = 0
+        self.sequence = 0
+
+    def publish(self, swarm, t):
+        sequence = self.sequence + 1
+        index = sequence % 2
+        self._writing = sequence
+        buffer = self._buffers[index]
+        for name, columns in self.COLUMNS.items():
+            buffer[:, columns] = getattr(swarm, name)
+        self._times[index] = t
+        self.sequence = sequence
+
+    def latest(self):
+        """(state, t, sequence) without copying
+
+        `state` is a read-only view that stays valid until the next publish() starts, so
+        use it from the simulation thread (controllers, plotting) or copy it with read().
+        """
+        sequence = self.sequence
+        index = sequence % 2
+        return self._views[index], self._times[index], sequence
+
+    def read(self, out=None):
+        """Consistent (state copy, t, sequence) from any thread"""
+        if out is None:
+            out = np.empty_like(self._buffers[0])
+        while True:
+            sequence = self.sequence
+            index = sequence % 2
+            np.copyto(out, self._buffers[index])
+            t = self._times[index]
+            # The buffer is only rewritten by snapshot sequence + 2
+            if self._writing <= sequence + 1:
+                return out, t, sequence
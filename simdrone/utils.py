@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import dataclasses
 import numpy as np
 
 
@@ -32,6 +33,20 @@ ROT_SPEED = 90.0
 
 
 
+@dataclasses.dataclass
+class DroneParameters:
+    """Physical parameters of one drone; SwarmState keeps one array per field"""
+    mass: float         = MASS
+    Ixx: float          = IXX
+    Iyy: float          = IYY
+    Izz: float          = IZZ
+    max_thrust: float   = MAX_THRUST
+    max_torque: float   = MAX_TORQUE
+    drag_linear: float  = 0.0  # N per m/s
+
+
+
+
 class TransformState:
 
     def __init__(self, position=[0.0, 0.0, -0.5]):
@@ -0,0 +1,410 @@
+# world.py
+# Copyright 2026 MinSup Kim
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import numpy as np
+
+from spatial import expand_ranges
+
+
+
+
+def box_triangles(center, size):
+    """(12,3,3) triangles of an axis-aligned box"""
+    center = np.asarray(center, dtype=float)
+    h = np.broadcast_to(np.asarray(size, dtype=float) / 2, (3,))
+    corners = center + h * np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)])
+    # Two triangles per face, corner index bits are x, y, z
+    faces = [
+        (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),  # -x, +x
+        (0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),  # -y, +y
+        (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),  # -z, +z
+    ]
+    return corners[np.array(faces)]
+
+
+def read_obj(path):
+    """Vertices (V,3) and triangle indices (F,3) of a Wavefront OBJ; polygons become fans"""
+    vertices, faces = [], []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'v':
+                vertices.append([float(v) for v in parts[1:4]])
+            elif parts[0] == 'f':
+                # "f 1 2 3", "f 1/1 2/2 3/3" or "f 1//1 ..."; negative indices count from the end
+                index = [int(p.split('/')[0]) for p in parts[1:]]
+                index = [i - 1 if i > 0 else len(vertices) + i for i in index]
+                faces.extend([index[0], index[k], index[k + 1]] for k in range(1, len(index) - 1))
+    return np.array(vertices, dtype=float).reshape(-1, 3), np.array(faces, dtype=np.int64).reshape(-1, 3)
+
+
+def closest_points_on_triangles(p, a, b, c):
+    """Closest point to each p on triangle (a, b, c), all (K,3) (Ericson, Real-Time Collision Detection 5.1.5)"""
+    def dot(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    ab, ac, ap = b - a, c - a, p - a
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    bp = p - b
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    cp = p - c
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = 1.0 / (va + vb + vc)
+        result = a + ab * (vb * denom)[:, None] + ac * (vc * denom)[:, None]
+        # Voronoi regions, lowest priority first so the earlier tests of the scalar version win
+        region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result[region] = (b + (c - b) * w[:, None])[region]
+        region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        w = d2 / (d2 - d6)
+        result[region] = (a + ac * w[:, None])[region]
+        region = (d6 >= 0) & (d5 <= d6)
+        result[region] = c[region]
+        region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        v = d1 / (d1 - d3)
+        result[region] = (a + ab * v[:, None])[region]
+        region = (d3 >= 0) & (d4 <= d3)
+        result[region] = b[region]
+        region = (d1 <= 0) & (d2 <= 0)
+        result[region] = a[region]
+    return result
+
+
+def ray_triangle_distances(origins, directions, a, b, c):
+    """Möller-Trumbore: distance along each (unit) ray to its triangle, inf on a miss"""
+    e1, e2 = b - a, c - a
+    pvec = np.cross(directions, e2)
+    det = np.einsum('ij,ij->i', e1, pvec)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / det
+        tvec = origins - a
+        u = np.einsum('ij,ij->i', tvec, pvec) * inv
+        qvec = np.cross(tvec, e1)
+        v = np.einsum('ij,ij->i', directions, qvec) * inv
+        t = np.einsum('ij,ij->i', e2, qvec) * inv
+        hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+class BVH:
+    """Bounding volume hierarchy over primitive AABBs, flattened into arrays
+
+    Node k has bounds node_min[k]/node_max[k]; internal nodes have children left[k]
+    and right[k], leaves (left == -1) own primitives order[start[k]:start[k] + count[k]].
+    Queries walk the tree for a whole batch at once: the frontier is a pair of arrays
+    (query, node), tested and expanded one level per iteration.
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, lo, hi):
+        n = len(lo)
+        centroid = (lo + hi) / 2
+        self.order = np.arange(n)
+        node_min, node_max, left, right, start, count = [], [], [], [], [], []
+
+        # (node, first, last) ranges of self.order still to split
+        stack = [(self._new_node(node_min, node_max, left, right, start, count), 0, n)]
+        while stack:
+            node, first, last = stack.pop()
+            items = self.order[first:last]
+            node_min[node] = lo[items].min(axis=0) if len(items) else np.zeros(3)
+            node_max[node] = hi[items].max(axis=0) if len(items) else np.zeros(3)
+            if last - first <= self.LEAF_SIZE:
+                start[node], count[node] = first, last - first
+                continue
+            # Median split along the axis where the centroids spread most
+            spread = np.ptp(centroid[items], axis=0)
+            axis = int(np.argmax(spread))
+            middle = (last - first) // 2
+            part = np.argpartition(centroid[items, axis], middle)
+            self.order[first:last] = items[part]
+            left[node] = self._new_node(node_min, node_max, left, right, start, count)
+            right[node] = self._new_node(node_min, node_max, left, right, start, count)
+            stack.append((left[node], first, first + middle))
+            stack.append((right[node], first + middle, last))
+
+        self.node_min = np.array(node_min)
+        self.node_max = np.array(node_max)
+        self.left = np.array(left)
+        self.right = np.array(right)
+        self.start = np.array(start)
+        self.count = np.array(count)
+
+    @staticmethod
+    def _new_node(node_min, node_max, left, right, start, count):
+        node_min.append(None)
+        node_max.append(None)
+        left.append(-1)
+        right.append(-1)
+        start.append(0)
+        count.append(0)
+        return len(left) - 1
+
+    def _traverse(self, num_queries, overlaps):
+        """(query, leaf node, key) for every leaf a query reaches
+
+        overlaps(query, node) tests node AABBs in batch and returns (hit mask, key), the
+        key being whatever per-pair value the caller wants back for the leaves.
+        """
+        query = np.arange(num_queries)
+        node = np.zeros(num_queries, dtype=np.int64)
+        queries, leaves, keys = [], [], []
+        while len(query):
+            hit, key = overlaps(query, node)
+            query, node, key = query[hit], node[hit], key[hit]
+            leaf = self.left[node] < 0
+            queries.append(query[leaf])
+            leaves.append(node[leaf])
+            keys.append(key[leaf])
+            inner = ~leaf
+            query = np.concatenate([query[inner], query[inner]])
+            node = np.concatenate([self.left[node[inner]], self.right[node[inner]]])
+        return np.concatenate(queries), np.concatenate(leaves), np.concatenate(keys)
+
+    def primitives(self, query, leaf):
+        """Expand (query, leaf) pairs into (query, primitive) pairs"""
+        counts = self.count[leaf]
+        return np.repeat(query, counts), self.order[expand_ranges(self.start[leaf], counts)]
+
+    def overlap_boxes(self, lo, hi):
+        """(query, primitive) candidates whose AABB overlaps the query boxes lo/hi (K,3)"""
+        def overlaps(query, node):
+            hit = np.all((lo[query] <= self.node_max[node]) & (hi[query] >= self.node_min[node]), axis=1)
+            return hit, hit
+        query, leaf, _ = self._traverse(len(lo), overlaps)
+        return self.primitives(query, leaf)
+
+    def ray_leaves(self, origins, directions, max_distance, min_distance=None):
+        """(ray, leaf, entry distance) for every leaf box a ray crosses between min_distance
+        and max_distance (K,)"""
+        # Axis-parallel rays: a huge finite inverse keeps the slab test free of inf * 0
+        safe = np.where(np.abs(directions) < 1e-30, 1e-30, directions)
+        inverse = 1.0 / safe
+
+        if min_distance is None:
+            min_distance = np.zeros(len(origins))
+
+        def overlaps(query, node):
+            o, inv = origins[query], inverse[query]
+            t1 = (self.node_min[node] - o) * inv
+            t2 = (self.node_max[node] - o) * inv
+            near = np.minimum(t1, t2).max(axis=1)
+            far = np.maximum(t1, t2).min(axis=1)
+            hit = (near <= far) & (far >= min_distance[query]) & (near <= max_distance[query])
+            return hit, np.maximum(near, 0.0)
+        return self._traverse(len(origins), overlaps)
+
+
+class World:
+    """Static obstacles as triangles (boxes and OBJ meshes) with batched collision and raycasts
+
+    Coordinates are physics NED like the drones. The BVH is rebuilt lazily after
+    obstacles are added; `version` changes with every edit so renderers can cache.
+    Assign to HeadlessSimulator.world to push drones (spheres of `drone_radius`) out
+    of obstacles after every step.
+    """
+
+    def __init__(self, drone_radius=0.5):
+        self.drone_radius = drone_radius
+        self.triangles = np.empty((0, 3, 3))
+        self.colors = np.empty((0, 3))
+        self.version = 0
+        self._bvh = None
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def add_triangles(self, triangles, color=(0.45, 0.5, 0.55)):
+        triangles = np.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+        self.triangles = np.concatenate([self.triangles, triangles])
+        self.colors = np.concatenate([self.colors, np.tile(color, (len(triangles), 1))])
+        self.version += 1
+        self._bvh = None
+
+    def add_box(self, center, size, color=(0.45, 0.5, 0.55)):
+        self.add_triangles(box_triangles(center, size), color)
+
+    def add_boxes(self, centers, sizes, color=(0.45, 0.5, 0.55)):
+        """Many boxes at once: centers (K,3), sizes (K,3) or (K,) for cubes"""
+        centers = np.asarray(centers, dtype=float)
+        sizes = np.broadcast_to(np.asarray(sizes, dtype=float).reshape(len(centers), -1), centers.shape)
+        unit = box_triangles(np.zeros(3), 1.0)
+        self.add_triangles(centers[:, None, None, :] + unit[None] * sizes[:, None, None, :], color)
+
+    def add_mesh(self, vertices, faces, color=(0.45, 0.5, 0.55), offset=(0.0, 0.0, 0.0), scale=1.0):
+        vertices = np.asarray(vertices, dtype=float) * scale + offset
+        self.add_triangles(vertices[np.asarray(faces)], color)
+
+    def load(self, path):
+        """Add an OBJ mesh, or a JSON scene of boxes and meshes:
+
+        {"boxes": [{"center": [x, y, z], "size": [sx, sy, sz], "color": [r, g, b]}],
+         "meshes": [{"path": "tower.obj", "offset": [x, y, z], "scale": 1.0}]}
+
+        Mesh paths are relative to the scene file.
+        """
+        if path.lower().endswith('.obj'):
+            self.add_mesh(*read_obj(path))
+            return self
+        with open(path) as f:
+            scene = json.load(f)
+        for box in scene.get('boxes', []):
+            self.add_box(box['center'], box['size'], box.get('color', (0.45, 0.5, 0.55)))
+        for mesh in scene.get('meshes', []):
+            vertices, faces = read_obj(os.path.join(os.path.dirname(path), mesh['path']))
+            self.add_mesh(vertices, faces, mesh.get('color', (0.45, 0.5, 0.55)),
+                          mesh.get('offset', (0.0, 0.0, 0.0)), mesh.get('scale', 1.0))
+        return self
+
+    @property
+    def bvh(self):
+        if self._bvh is None:
+            self._bvh = BVH(self.triangles.min(axis=1), self.triangles.max(axis=1))
+        return self._bvh
+
+    def normals(self, index):
+        t = self.triangles[index]
+        n = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0])
+        return n / np.linalg.norm(n, axis=1)[:, None]
+
+    def collide(self, positions, radius=None):
+        """Deepest contact of each sphere that touches an obstacle
+
+        Returns (drone, triangle, normal, depth): indices of touching spheres, the
+        triangle each one penetrates most, the push-out direction and the depth.
+        """
+        radius = self.drone_radius if radius is None else radius
+        if not len(self.triangles) or not len(positions):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0)
+        drone, triangle = self.bvh.overlap_boxes(positions - radius, positions + radius)
+        t = self.triangles[triangle]
+        closest = closest_points_on_triangles(positions[drone], t[:, 0], t[:, 1], t[:, 2])
+        offset = positions[drone] - closest
+        distance = np.linalg.norm(offset, axis=1)
+        touching = distance < radius
+        drone, triangle, offset, distance = drone[touching], triangle[touching], offset[touching], distance[touching]
+
+        # Keep the deepest contact per drone
+        order = np.lexsort((distance, drone))
+        drone, first = np.unique(drone[order], return_index=True)
+        pick = order[first]
+        triangle, offset, distance = triangle[pick], offset[pick], distance[pick]
+        # Centre on the surface: fall back to the face normal
+        flat = distance < 1e-9
+        normal = offset / np.where(flat, 1.0, distance)[:, None]
+        normal[flat] = self.normals(triangle[flat])
+        return drone, triangle, normal, radius - distance
+
+    def resolve(self, swarm, radius=None):
+        """Push touching drones out of obstacles and cancel their velocity into them"""
+        drone, triangle, normal, depth = self.collide(swarm.position, radius)
+        if len(drone):
+            swarm.position[drone] += normal * depth[:, None]
+            into = np.einsum('ij,ij->i', swarm.velocity[drone], normal)
+            swarm.velocity[drone] -= normal * np.minimum(into, 0.0)[:, None]
+        return drone
+
+    def raycast(self, origins, directions, max_distance=np.inf, ground=True):
+        """Nearest hit along each ray (directions are normalised here)
+
+        Returns (distance, triangle): inf / -1 on a miss, triangle -2 for the ground
+        plane z = 0 when `ground` is set.
+        """
+        origins = np.atleast_2d(np.asarray(origins, dtype=float))
+        directions = np.atleast_2d(np.asarray(directions, dtype=float))
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+        max_distance = np.broadcast_to(np.asarray(max_distance, dtype=float), (len(origins),))
+        distance = np.full(len(origins), np.inf)
+        triangle = np.full(len(origins), -1)
+
+        if ground:
+            # NED: the ground is z = 0, below the drones at negative z
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = -origins[:, 2] / directions[:, 2]
+            down = (directions[:, 2] > 0) & (t >= 0)
+            distance[down] = t[down]
+            triangle[down] = -2
+
+        if len(self.triangles):
+            # The ground hit, if any, bounds how far obstacles need searching
+            self._raycast_bvh(origins, directions, np.minimum(max_distance, distance), distance, triangle)
+
+        missed = distance > max_distance
+        distance[missed] = np.inf
+        triangle[missed] = -1
+        return distance, triangle
+
+    def _raycast_bvh(self, origins, directions, max_distance, distance, triangle):
+        """Nearest triangle hits closer than `distance`, written into `distance` and `triangle`
+
+        Rays are cast in segments of doubling length, starting at a couple of leaf sizes,
+        and a ray stops after the first segment that holds its hit; so a ray that hits
+        something close never walks the far side of the tree.
+        """
+        bvh = self.bvh
+        # Nothing lies beyond the far side of the root box
+        centre = (bvh.node_min[0] + bvh.node_max[0]) / 2
+        half = np.linalg.norm(bvh.node_max[0] - bvh.node_min[0]) / 2
+        limit = np.minimum(max_distance, np.linalg.norm(origins - centre, axis=1) + half)
+        leaf = bvh.left < 0
+        segment = 2 * np.linalg.norm(bvh.node_max[leaf] - bvh.node_min[leaf], axis=1).mean()
+
+        todo = np.flatnonzero(limit >= 0)
+        start = np.zeros(len(todo))
+        reach = np.minimum(segment, limit[todo])
+        while len(todo):
+            self._raycast_segment(todo, origins[todo], directions[todo], start, reach, distance, triangle)
+            more = (distance[todo] > reach) & (reach < limit[todo])
+            todo, start = todo[more], reach[more]
+            reach = np.minimum(2 * start, limit[todo])
+
+    def _raycast_segment(self, index, origins, directions, start, reach, distance, triangle):
+        """One segment of _raycast_bvh for the rays `index` (origins etc. already indexed by it)
+
+        Each ray's leaves are visited nearest entry first, one per round across the whole
+        batch, and a ray drops out once its next leaf starts beyond its best hit.
+        """
+        ray, leaf, near = self.bvh.ray_leaves(origins, directions, reach, start)
+        order = np.lexsort((near, ray))
+        ray, leaf, near = ray[order], leaf[order], near[order]
+        rays, first, counts = np.unique(ray, return_index=True, return_counts=True)
+
+        k = 0
+        active = np.arange(len(rays))
+        while len(active):
+            slot = first[active] + k
+            go = near[slot] <= distance[index[ray[slot]]]
+            slot = slot[go]
+            r, candidate = self.bvh.primitives(ray[slot], leaf[slot])
+            t = self.triangles[candidate]
+            d = ray_triangle_distances(origins[r], directions[r], t[:, 0], t[:, 1], t[:, 2])
+            r = index[r]
+            better = d < distance[r]
+            # Farthest first, so with repeated rays the nearest hit is written last
+            o = np.flatnonzero(better)[np.argsort(-d[better])]
+            distance[r[o]] = d[o]
+            triangle[r[o]] = candidate[o]
+            k += 1
+            active = active[go]
+            active = active[counts[active] > k]